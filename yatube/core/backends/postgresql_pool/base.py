@@ -0,0 +1,52 @@
+"""PostgreSQL с пулом соединений psycopg2 в каждом процессе.
+
+Django закрывает соединение в конце запроса (CONN_MAX_AGE = 0), а этот
+бэкенд вместо закрытия возвращает его в пул. Размер пула задаётся
+settings_dict['POOL']: MIN_SIZE и MAX_SIZE. MAX_SIZE должен быть не
+меньше числа потоков процесса, иначе лишний поток получит PoolError.
+"""
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_pool(self, conn_params):
+        # Пул не переживает fork: у каждого процесса свой.
+        key = (self.alias, os.getpid())
+        with _pools_lock:
+            if key not in _pools:
+                options = self.settings_dict.get('POOL', {})
+                _pools[key] = pool.ThreadedConnectionPool(
+                    options.get('MIN_SIZE', 1),
+                    options.get('MAX_SIZE', 10),
+                    **conn_params
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        connections = self.get_pool(conn_params)
+        connection = connections.getconn()
+        while connection.closed:
+            connections.putconn(connection, close=True)
+            connection = connections.getconn()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            # Незавершённую транзакцию пул откатывает сам.
+            with self.wrap_database_errors:
+                self.get_pool(self.get_connection_params()).putconn(
+                    self.connection, close=bool(self.connection.closed)
+                )
@@ -0,0 +1,20 @@
+"""SQLite с настройками для нескольких одновременных писателей.
+
+PRAGMA из settings_dict['PRAGMAS'] выполняются на каждом новом
+соединении. Транзакции начинаются с BEGIN IMMEDIATE: писатель сразу
+занимает блокировку записи и при занятой базе ждёт busy_timeout, а не
+получает «database is locked», когда пытается перейти от чтения к записи.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict.get('PRAGMAS', {})
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name}={value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
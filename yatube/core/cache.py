@@ -0,0 +1,428 @@
+"""Бэкенды кэша.
+
+TieredCache — двухуровневый кэш: маленький LRU в памяти процесса (L1)
+перед общим для всех процессов кэшем (L2, алиас OPTIONS['SHARED']).
+Запись ключа в L2 получает номер из счётчика в L2, и под этим номером
+в L2 остаётся имя ключа — журнал изменений. Процесс сверяет счётчик не
+чаще раза в CHECK_INTERVAL секунд и выбрасывает из своего L1 только
+ключи из журнала с прошлой сверки, поэтому чужие изменения видны с
+задержкой не больше CHECK_INTERVAL, а остальной L1 сохраняется. Весь L1
+очищается, только если журнал не удалось дочитать или L2 очистили.
+Рядом с каждым значением в L2 лежит срок его жизни, и копия в L1 живёт
+не дольше него.
+
+SQLiteCache — общий кэш в файле SQLite для нескольких процессов на
+одной машине, без сетевого сервиса.
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+_MISSING = object()
+
+SEQUENCE_KEY: str = 'tiered:sequence'
+EPOCH_KEY: str = 'tiered:epoch'
+CHANGE_KEY: str = 'tiered:change:{}'
+EXPIRES_KEY: str = 'tiered:expires:{}'
+
+
+class MetricsCacheMixin:
+    """Считает попадания и промахи кэша и время обращений к нему."""
+
+    def get(self, key, default=None, version=None):
+        with metrics.timer('cache'):
+            value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            metrics.count('cache_miss')
+            return default
+        metrics.count('cache_hit')
+        return value
+
+    def set(self, *args, **kwargs):
+        with metrics.timer('cache'):
+            return super().set(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        with metrics.timer('cache'):
+            return super().add(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with metrics.timer('cache'):
+            return super().delete(*args, **kwargs)
+
+
+class LocalTier:
+    """L1 одного процесса: общий для всех потоков, как у LocMemCache."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.epoch = None
+        self.sequence = None
+        self.checked = None
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self.l1_timeout = options.get('L1_TIMEOUT', 300)
+        self.check_interval = options.get('CHECK_INTERVAL', 1)
+        with _tiers_lock:
+            self.tier = _tiers.setdefault(
+                (location, self.shared_alias), LocalTier()
+            )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def _sync(self):
+        tier = self.tier
+        now = time.monotonic()
+        if (tier.checked is not None
+                and now - tier.checked < self.check_interval):
+            return
+        tier.checked = now
+        state = self.shared.get_many([SEQUENCE_KEY, EPOCH_KEY])
+        sequence, epoch = state.get(SEQUENCE_KEY), state.get(EPOCH_KEY)
+        seen = tier.sequence
+        if sequence == seen and epoch == tier.epoch:
+            return
+        changed = None
+        if (epoch == tier.epoch and sequence is not None
+                and seen is not None
+                and 0 < sequence - seen <= self.l1_max_entries):
+            numbers = [
+                CHANGE_KEY.format(number)
+                for number in range(seen + 1, sequence + 1)
+            ]
+            changed = self.shared.get_many(numbers)
+            # Запись журнала могла истечь или ещё не дойти до L2.
+            if len(changed) < len(numbers):
+                changed = None
+        with tier.lock:
+            if changed is None:
+                tier.entries.clear()
+            else:
+                for key in changed.values():
+                    tier.entries.pop(key, None)
+            tier.sequence = sequence
+            tier.epoch = epoch
+
+    def _changed(self, *keys):
+        # Свой L1 правится сразу, чужие — по журналу. Собственный
+        # tier.sequence не сдвигается: иначе можно пропустить изменения,
+        # которые другой процесс записал раньше.
+        with self.tier.lock:
+            for key in keys:
+                self.tier.entries.pop(key, None)
+        if not keys:
+            return
+        try:
+            last = self.shared.incr(SEQUENCE_KEY, len(keys))
+        except ValueError:
+            # Новый счётчик — новая эпоха: после clear номера начинаются
+            # заново, и процессы по смене эпохи очищают L1 целиком.
+            self.shared.add(EPOCH_KEY, uuid4().hex, None)
+            self.shared.add(SEQUENCE_KEY, 0, None)
+            last = self.shared.incr(SEQUENCE_KEY, len(keys))
+        self.shared.set_many({
+            CHANGE_KEY.format(number): key
+            for number, key in enumerate(keys, last - len(keys) + 1)
+        }, self.l1_timeout)
+
+    def _deadlines(self, data, timeout):
+        # Срок жизни в L2 в секундах эпохи: по нему другие процессы
+        # ограничивают жизнь своих копий в L1.
+        deadline = None if timeout is None else time.time() + timeout
+        return {EXPIRES_KEY.format(key): deadline for key in data}
+
+    def _fetch(self, keys, version):
+        shared = self.shared.get_many(
+            [*keys, *(EXPIRES_KEY.format(key) for key in keys)],
+            version=version,
+        )
+        found = {}
+        for key in keys:
+            if key not in shared:
+                continue
+            found[key] = shared[key]
+            # Без записи о сроке (значение положили мимо TieredCache)
+            # копия живёт L1_TIMEOUT.
+            deadline = shared.get(EXPIRES_KEY.format(key), _MISSING)
+            self._remember(self._key(key, version), shared[key], (
+                self.l1_timeout if deadline is _MISSING
+                else None if deadline is None
+                else deadline - time.time()
+            ))
+        return found
+
+    def _remember(self, key, value, timeout):
+        if timeout is None or timeout > self.l1_timeout:
+            timeout = self.l1_timeout
+        if timeout <= 0:
+            return
+        entries = self.tier.entries
+        with self.tier.lock:
+            entries[key] = (
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                time.monotonic() + timeout,
+            )
+            entries.move_to_end(key)
+            while len(entries) > self.l1_max_entries:
+                entries.popitem(last=False)
+
+    def _recall(self, key):
+        entries = self.tier.entries
+        with self.tier.lock:
+            entry = entries.get(key)
+            if entry is None:
+                return _MISSING
+            pickled, expires = entry
+            if expires < time.monotonic():
+                del entries[key]
+                return _MISSING
+            entries.move_to_end(key)
+        metrics.count('cache_l1_hit')
+        return pickle.loads(pickled)
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        local_key = self._key(key, version)
+        value = self._recall(local_key)
+        if value is not _MISSING:
+            return value
+        return self._fetch([key], version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        found, missing = {}, []
+        for key in keys:
+            value = self._recall(self._key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            found.update(self._fetch(missing, version))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        failed = self.shared.set_many(
+            {**data, **self._deadlines(data, timeout)}, timeout,
+            version=version,
+        )
+        self._changed(*(self._key(key, version) for key in data))
+        return [key for key in failed if key in data]
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Удачный add пишет ключ, которого в L2 не было, поэтому его
+        # нет и ни в одном L1: в журнал он не попадает.
+        timeout = self._timeout(timeout)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self.shared.set_many(
+                self._deadlines([key], timeout), timeout, version=version
+            )
+        return added
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(
+            [*keys, *(EXPIRES_KEY.format(key) for key in keys)],
+            version=version,
+        )
+        self._changed(*(self._key(key, version) for key in keys))
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._changed(self._key(key, version))
+        return value
+
+    def has_key(self, key, version=None):
+        self._sync()
+        if self._recall(self._key(key, version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        touched = self.shared.touch(key, timeout, version=version)
+        if touched:
+            self.shared.set_many(
+                self._deadlines([key], timeout), timeout, version=version
+            )
+            self._changed(self._key(key, version))
+        return touched
+
+    def clear(self):
+        # Счётчик в L2 пропадает вместе со всем остальным, и другие
+        # процессы, не найдя его, очищают свой L1 целиком.
+        self.shared.clear()
+        with self.tier.lock:
+            self.tier.entries.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+
+class TieredCache(MetricsCacheMixin, TwoTierCache):
+    pass
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite (LOCATION) в режиме WAL.
+
+    Каждый поток держит своё соединение. add и incr атомарны между
+    процессами, поэтому на этом кэше работают блокировки posts.cache.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.location, timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return time.time() + timeout
+
+    def get(self, key, default=None, version=None):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._key(key, version), time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (self._key(key, version), pickle.dumps(value),
+             self._expires(timeout))
+        )
+        if random.random() < 1 / self._cull_frequency:
+            self._cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time())
+            )
+            inserted = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (key, pickle.dumps(value), self._expires(timeout))
+            ).rowcount
+        return inserted == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)', (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value), key)
+            )
+        return value
+
+    def delete(self, key, version=None):
+        self._connection().execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),)
+        )
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version) is not _MISSING
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ?',
+            (self._expires(timeout), self._key(key, version))
+        ).rowcount == 1
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def _cull(self):
+        connection = self._connection()
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency,)
+            )
+
+    def close(self, **kwargs):
+        # Соединение остаётся открытым между запросами, как у locmem.
+        pass
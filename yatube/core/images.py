@@ -0,0 +1,51 @@
+"""Варианты картинок для адаптивной вёрстки.
+
+Для каждой геометрии из шаблона строятся уменьшенные копии шириной из
+RESPONSIVE_IMAGE_WIDTHS с теми же пропорциями: в форматах из
+RESPONSIVE_IMAGE_FORMATS, которые умеет сохранять установленный Pillow,
+и в обычном формате миниатюр (JPEG) для остальных браузеров. Тег
+{% picture %} выводит их в <picture>/srcset, а фоновый поток миниатюр
+строит те же варианты заранее.
+"""
+from django.conf import settings
+from PIL import Image
+from sorl.thumbnail import base
+
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp'}
+
+# sorl знает расширения только для JPEG, PNG, GIF и WebP.
+base.EXTENSIONS.setdefault('AVIF', 'avif')
+
+
+def modern_formats():
+    Image.init()
+    return [
+        image_format for image_format in settings.RESPONSIVE_IMAGE_FORMATS
+        if image_format in Image.SAVE
+    ]
+
+
+def widths(geometry):
+    """Пары (ширина, геометрия) от меньшей к исходной."""
+    width, _, height = geometry.partition('x')
+    width = int(width)
+    result = [
+        (size, f'{size}x{round(int(height) * size / width)}'
+         if height else str(size))
+        for size in settings.RESPONSIVE_IMAGE_WIDTHS if size < width
+    ]
+    result.append((width, geometry))
+    return result
+
+
+def variants(geometry, options):
+    """Все (формат, ширина, геометрия, опции) для одной геометрии.
+
+    Формат None — обычный формат миниатюр, он идёт последним.
+    """
+    for image_format in modern_formats() + [None]:
+        for width, size in widths(geometry):
+            variant_options = dict(options)
+            if image_format:
+                variant_options['format'] = image_format
+            yield image_format, width, size, variant_options
@@ -0,0 +1,298 @@
+import json
+import os
+import re
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.middleware.csrf import _get_new_csrf_token
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+RESULTS_DIR: str = os.path.join(settings.BASE_DIR, 'benchmarks')
+RESULTS_FILE: str = 'results.jsonl'
+PERCENTILES = (50, 95, 99)
+
+
+class Target:
+    """Один замеряемый URL и всё, что нужно для запроса к нему."""
+
+    def __init__(self, name, path, cookies=None, data=None, headers=None):
+        self.name = name
+        self.path = path
+        self.cookies = cookies or {}
+        self.data = data
+        self.headers = headers or {}
+
+    def environ(self):
+        url = urlsplit(self.path)
+        environ = {
+            'REQUEST_METHOD': 'POST' if self.data is not None else 'GET',
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+        }
+        if self.cookies:
+            environ['HTTP_COOKIE'] = '; '.join(
+                f'{key}={value}' for key, value in self.cookies.items()
+            )
+        body = urlencode(self.data or {}).encode()
+        environ.update({
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+        })
+        environ.update(self.headers)
+        setup_testing_defaults(environ)
+        return environ
+
+
+def percentile(values, percent):
+    """Процентиль отсортированных values с линейной интерполяцией."""
+    if not values:
+        return 0
+    position = (len(values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный замер страниц yatube через WSGI-приложение. '
+        'Замер add_comment создаёт комментарии, поэтому запускайте его '
+        'на базе из seed_benchmark_data, а не на рабочей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Число запросов к каждому URL'
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--only', nargs='*', default=None,
+            help='Замерить только перечисленные страницы'
+        )
+        parser.add_argument(
+            '--cold-cache', action='store_true',
+            help='Очищать кэш перед прогревом каждой страницы'
+        )
+        parser.add_argument('--label', default='')
+        parser.add_argument('--output', default=RESULTS_DIR)
+
+    def handle(self, *args, **options):
+        self.handler = WSGIHandler()
+        targets = self.targets()
+        if options['only']:
+            targets = [
+                target for target in targets
+                if target.name in options['only']
+            ]
+        if not targets:
+            raise CommandError('Нечего замерять')
+
+        results = {}
+        for target in targets:
+            if options['cold_cache']:
+                cache.clear()
+            for _ in range(options['warmup']):
+                self.call(target)
+            results[target.name] = dict(
+                self.measure(
+                    target, options['requests'], options['concurrency']
+                ),
+                alloc_kib=self.allocations(target),
+            )
+
+        run = {
+            'time': timezone.now().isoformat(),
+            'label': options['label'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'cold_cache': options['cold_cache'],
+            'posts': Post.objects.count(),
+            'results': results,
+        }
+        previous = self.save(options['output'], run)
+        self.report(run, previous)
+
+    def targets(self):
+        reader = (
+            User.objects.annotate(following_count=Count('follower'))
+            .order_by('-following_count').first()
+        )
+        author = (
+            User.objects.annotate(posts_total=Count('posts'))
+            .order_by('-posts_total').first()
+        )
+        group = (
+            Group.objects.annotate(posts_total=Count('posts'))
+            .order_by('-posts_total').first()
+        )
+        post = (
+            Post.objects.annotate(comments_total=Count('comments'))
+            .order_by('-comments_total').first()
+        )
+        if reader is None or post is None:
+            raise CommandError(
+                'В базе нет данных: сначала запустите seed_benchmark_data'
+            )
+        client = Client()
+        client.force_login(reader)
+        csrf_token = _get_new_csrf_token()
+        cookies = {
+            settings.SESSION_COOKIE_NAME:
+                client.cookies[settings.SESSION_COOKIE_NAME].value,
+            settings.CSRF_COOKIE_NAME: csrf_token,
+        }
+        second_page = self.second_page(reverse('posts:index'))
+
+        targets = [
+            Target('index', reverse('posts:index')),
+            Target('index_page_2', second_page),
+            Target(
+                'profile', reverse('posts:profile', args=[author.username])
+            ),
+            Target(
+                'post_detail', reverse('posts:post_detail', args=[post.pk])
+            ),
+            Target('follow_index', reverse('posts:follow_index'), cookies),
+            Target(
+                'add_comment',
+                reverse('posts:add_comment', args=[post.pk]),
+                cookies,
+                data={'text': 'Комментарий из нагрузочного теста'},
+                headers={'HTTP_X_CSRFTOKEN': csrf_token},
+            ),
+        ]
+        if group is not None:
+            targets.insert(2, Target(
+                'group_posts', reverse('posts:group_list', args=[group.slug])
+            ))
+        return targets
+
+    def second_page(self, path):
+        # Ссылку на вторую страницу берём из первой: в режиме курсоров
+        # её адрес зависит от данных.
+        content = Client().get(path).content.decode()
+        cursor = re.search(r'\?cursor=([\w=-]+)', content)
+        if cursor:
+            return f'{path}?cursor={cursor.group(1)}'
+        return f'{path}?page=2'
+
+    def call(self, target):
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split()[0]))
+
+        response = self.handler(target.environ(), start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return status[0]
+
+    def timed_call(self, target):
+        queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count_queries):
+                status = self.call(target)
+        except Exception:
+            status = None
+        finally:
+            reset_queries()
+        elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, len(queries), status
+
+    def measure(self, target, total, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(
+                lambda _: self.timed_call(target), range(total)
+            ))
+        duration = time.perf_counter() - started
+        latencies = sorted(sample[0] for sample in samples)
+        errors = sum(
+            1 for _, _, status in samples if status is None or status >= 400
+        )
+        measured = {
+            f'p{percent}_ms': round(percentile(latencies, percent), 2)
+            for percent in PERCENTILES
+        }
+        measured.update({
+            'rps': round(total / duration, 1),
+            'errors': errors,
+            'queries': round(
+                statistics.mean(sample[1] for sample in samples), 1
+            ),
+        })
+        return measured
+
+    def allocations(self, target):
+        # Отдельный последовательный проход: tracemalloc учитывает
+        # память всех потоков сразу и замедляет каждый запрос.
+        tracemalloc.start()
+        try:
+            self.call(target)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return round(peak / 1024, 1)
+
+    def save(self, directory, run):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, RESULTS_FILE)
+        previous = None
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as results:
+                lines = [line for line in results if line.strip()]
+            if lines:
+                previous = json.loads(lines[-1])
+        with open(path, 'a', encoding='utf-8') as results:
+            results.write(json.dumps(run, ensure_ascii=False) + '\n')
+        return previous
+
+    def report(self, run, previous):
+        before = previous['results'] if previous else {}
+        columns = ('p50_ms', 'p95_ms', 'p99_ms', 'rps', 'queries', 'alloc_kib')
+        self.stdout.write(
+            f'{"страница":<14}' + ''.join(f'{name:>18}' for name in columns)
+            + f'{"ошибки":>8}'
+        )
+        for name, measured in run['results'].items():
+            cells = []
+            for column in columns:
+                cell = f'{measured[column]:g}'
+                old = before.get(name, {}).get(column)
+                if old:
+                    change = (measured[column] - old) / old * 100
+                    cell += f' ({change:+.0f}%)'
+                cells.append(f'{cell:>18}')
+            line = f'{name:<14}' + ''.join(cells) + f'{measured["errors"]:>8}'
+            style = self.style.ERROR if measured['errors'] else str
+            self.stdout.write(style(line))
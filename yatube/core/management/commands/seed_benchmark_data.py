@@ -0,0 +1,135 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from mixer.backend.django import mixer
+
+from core.models import explicit_timestamps
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEXT_POOL_SIZE: int = 5000
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу объёмом данных для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--comments', type=int, default=300_000)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности авторов'
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.period = timedelta(days=options['days']).total_seconds()
+        faker = mixer.faker
+        self.texts = [faker.text() for _ in range(TEXT_POOL_SIZE)]
+
+        users = self.seed_users(options['users'], faker)
+        weights = list(accumulate(
+            1 / rank ** options['skew'] for rank in range(1, len(users) + 1)
+        ))
+        groups = self.seed_groups(options['groups'], faker)
+        with explicit_timestamps(Post, Comment):
+            posts = self.seed_posts(options['posts'], users, weights, groups)
+            self.seed_comments(options['comments'], users, posts)
+        self.seed_follows(options['follows_per_user'], users, weights)
+
+        self.stdout.write('Пересчёт производных данных')
+        for command in (
+            'reconcile_counters', 'rebuild_search_index', 'rebuild_feeds'
+        ):
+            call_command(command, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Данные для замеров готовы'))
+
+    def progress(self, label, done, total):
+        self.stdout.write(f'\r{label}: {done}/{total}', ending='')
+        if done >= total:
+            self.stdout.write('')
+        self.stdout.flush()
+
+    def created(self):
+        return self.now - timedelta(
+            seconds=self.random.random() * self.period
+        )
+
+    def bulk(self, model, label, total, make):
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            model.objects.bulk_create(
+                [make(start + index) for index in range(size)],
+                ignore_conflicts=model is Follow
+            )
+            self.progress(label, start + size, total)
+
+    def seed_users(self, total, faker):
+        offset = User.objects.count()
+        self.bulk(User, 'Пользователи', total, lambda index: User(
+            username=f'bench_{offset + index}',
+            first_name=faker.first_name(),
+            last_name=faker.last_name(),
+            password='!',
+        ))
+        return list(
+            User.objects.filter(username__startswith='bench_')
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def seed_groups(self, total, faker):
+        self.bulk(Group, 'Группы', total, lambda index: Group(
+            title=faker.sentence(nb_words=3)[:200],
+            slug=f'bench-{index}-{self.random.getrandbits(32):x}',
+            description=faker.sentence(),
+        ))
+        return list(Group.objects.values_list('pk', flat=True))
+
+    def seed_posts(self, total, users, weights, groups):
+        def make(index):
+            created = self.created()
+            return Post(
+                author_id=self.random.choices(users, cum_weights=weights)[0],
+                group_id=(
+                    self.random.choice(groups)
+                    if groups and self.random.random() < 0.5 else None
+                ),
+                text=self.random.choice(self.texts),
+                created=created,
+                modified=created,
+            )
+        self.bulk(Post, 'Посты', total, make)
+        return list(Post.objects.values_list('pk', flat=True))
+
+    def seed_comments(self, total, users, posts):
+        if not posts:
+            return
+        self.bulk(Comment, 'Комментарии', total, lambda index: Comment(
+            post_id=self.random.choice(posts),
+            author_id=self.random.choice(users),
+            text=self.random.choice(self.texts),
+            created=self.created(),
+        ))
+
+    def seed_follows(self, per_user, users, weights):
+        def make(index):
+            user = users[index // per_user]
+            author = self.random.choices(users, cum_weights=weights)[0]
+            while author == user:
+                author = self.random.choice(users)
+            return Follow(user_id=user, author_id=author)
+        self.bulk(Follow, 'Подписки', len(users) * per_user, make)
@@ -0,0 +1,25 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик: локальная '
+        'замена репликации'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError('Реплики копируются только для SQLite')
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            name = connections[alias].settings_dict['NAME']
+            connections[alias].close()
+            with sqlite3.connect(name) as replica:
+                primary.connection.backup(replica)
+            self.stdout.write(f'{alias}: {name}')
+        self.stdout.write(self.style.SUCCESS('Реплики обновлены'))
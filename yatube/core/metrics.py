@@ -0,0 +1,54 @@
+"""Метрики производительности запроса.
+
+MetricsMiddleware заводит на время запроса RequestMetrics, а точки
+измерения (SQL, шаблоны, кэш, миниатюры) добавляют в него время и
+счётчики через timer() и count(). Вне запроса, например в фоновых
+потоках, они ничего не делают.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.counts = defaultdict(int)
+
+
+def current():
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def collect():
+    previous = current()
+    _local.metrics = RequestMetrics()
+    try:
+        yield _local.metrics
+    finally:
+        _local.metrics = previous
+
+
+@contextmanager
+def timer(name):
+    """Прибавляет время блока в миллисекундах к метрике name."""
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += (time.perf_counter() - started) * 1000
+        metrics.counts[name] += 1
+
+
+def count(name, value=1):
+    metrics = current()
+    if metrics is not None:
+        metrics.counts[name] += value
@@ -0,0 +1,131 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers
+
+logger = logging.getLogger('core.metrics')
+
+# Слои, которые попадают в Server-Timing и в лог.
+TIMINGS = ('sql', 'template', 'cache', 'thumbnail')
+
+STICKY_COOKIE: str = 'primary_db'
+
+
+def time_query(execute, sql, params, many, context):
+    with metrics.timer('sql'):
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Замеряет запрос целиком и по слоям.
+
+    Итог уходит в заголовок Server-Timing и в лог core.metrics: обычные
+    запросы пишутся с уровнем INFO, медленные (дольше
+    REQUEST_METRICS_SLOW_MS) — с WARNING. Если задан REQUEST_PROFILE_DIR,
+    доля REQUEST_PROFILE_SAMPLE_RATE запросов идёт под cProfile, и профиль
+    медленных из них сохраняется в этот каталог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler = self.profiler()
+        with metrics.collect() as collected, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(time_query))
+            started = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+            total = (time.perf_counter() - started) * 1000
+
+        slow = total >= settings.REQUEST_METRICS_SLOW_MS
+        response['Server-Timing'] = self.server_timing(collected, total)
+        self.log(request, response, collected, total, slow)
+        if profiler and slow:
+            self.dump(profiler, request, total)
+        return response
+
+    def profiler(self):
+        if not getattr(settings, 'REQUEST_PROFILE_DIR', None):
+            return None
+        if random.random() >= settings.REQUEST_PROFILE_SAMPLE_RATE:
+            return None
+        return cProfile.Profile()
+
+    def server_timing(self, collected, total):
+        entries = [f'total;dur={total:.1f}']
+        for name in TIMINGS:
+            if name in collected.counts:
+                entries.append(
+                    f'{name};dur={collected.timings[name]:.1f};'
+                    f'desc="{collected.counts[name]} calls"'
+                )
+        return ', '.join(entries)
+
+    def log(self, request, response, collected, total, slow):
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total, 1),
+        }
+        for name in TIMINGS:
+            data[f'{name}_ms'] = round(collected.timings[name], 1)
+            data[f'{name}_count'] = collected.counts[name]
+        data['cache_hits'] = collected.counts['cache_hit']
+        data['cache_misses'] = collected.counts['cache_miss']
+        data['cache_l1_hits'] = collected.counts['cache_l1_hit']
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            ' '.join(f'{key}={value}' for key, value in data.items()),
+            extra={'metrics': data}
+        )
+
+    def dump(self, profiler, request, total):
+        directory = settings.REQUEST_PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'\W+', '-', request.path).strip('-') or 'root'
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{slug}-{total:.0f}ms.prof'
+        profiler.dump_stats(os.path.join(directory, name))
+
+
+class ReplicaMiddleware:
+    """Разрешает GET- и HEAD-запросам читать с реплик (core.routers).
+
+    После запроса с записью ставит cookie на REPLICA_STICKY_SECONDS: пока
+    она жива, запросы клиента читают основную базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        allowed = (
+            request.method in ('GET', 'HEAD')
+            and STICKY_COOKIE not in request.COOKIES
+        )
+        with routers.replica_reads(allowed):
+            response = self.get_response(request)
+            wrote = routers.wrote()
+        if wrote:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True
+            )
+        return response
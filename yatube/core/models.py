@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 from django.db import models
 
 
@@ -9,3 +11,21 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+@contextmanager
+def explicit_timestamps(*model_classes):
+    """Даёт bulk_create записать свои created/modified."""
+    fields = [
+        field for model in model_classes for field in model._meta.fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
@@ -0,0 +1,62 @@
+"""Чтение с реплик базы.
+
+ReplicaMiddleware разрешает чтение с реплик (settings.DATABASE_REPLICAS)
+только на время GET- и HEAD-запросов. Всё остальное читает основную базу:
+запросы с записью, management-команды, фоновые потоки. Если за запрос
+что-то записано, клиент получает cookie и ещё REPLICA_STICKY_SECONDS
+читает основную базу, чтобы увидеть свои изменения, даже пока реплики
+отстают.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_local = threading.local()
+
+# Приложения, которые всегда читают основную базу: сессия, записанная
+# при входе, нужна уже на следующем запросе.
+PRIMARY_APPS = frozenset({'sessions'})
+
+
+def replicas_allowed():
+    return getattr(_local, 'replicas', False)
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    """Разрешает или запрещает чтение с реплик внутри блока."""
+    previous = replicas_allowed()
+    _local.replicas = allowed
+    _local.wrote = False
+    try:
+        yield
+    finally:
+        _local.replicas = previous
+
+
+def wrote():
+    """Была ли запись в базу внутри последнего блока replica_reads."""
+    return getattr(_local, 'wrote', False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or not replicas_allowed()
+                or model._meta.app_label in PRIMARY_APPS):
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        # После первой записи запрос дочитывает основную базу.
+        _local.replicas = False
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,24 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with metrics.timer('template'):
+            return super().render(context, request)
+
+
+class MetricsDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, который замеряет время рендеринга.
+
+    Замеряется только внешний render(): вложенные {% include %}
+    рендерятся внутри него и второй раз не учитываются.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
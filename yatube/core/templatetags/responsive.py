@@ -0,0 +1,59 @@
+from itertools import groupby
+
+from django import template
+from django.utils.html import format_html, format_html_join
+from sorl.thumbnail import default
+
+from core import images
+
+register = template.Library()
+
+DEFAULT_SIZES: str = '100vw'
+
+
+@register.simple_tag
+def picture(image, geometry, css_class='', sizes=DEFAULT_SIZES, alt='',
+            **options):
+    """<picture> с вариантами картинки по ширине и формату.
+
+    Варианты, которые фоновый поток ещё не построил, пропускаются; пока
+    нет ни одного, выводится исходная картинка, как у {% thumbnail %}.
+    """
+    if not image:
+        return ''
+    sources = []
+    fallback = None
+    for image_format, group in groupby(
+        images.variants(geometry, options), key=lambda variant: variant[0]
+    ):
+        srcset = []
+        for _, width, size, variant_options in group:
+            thumbnail = default.backend.get_thumbnail(
+                image, size, **variant_options
+            )
+            if thumbnail.name != image.name:
+                srcset.append((thumbnail.url, width))
+                largest = thumbnail
+        if not srcset:
+            continue
+        srcset = format_html_join(', ', '{} {}w', srcset)
+        if image_format:
+            sources.append((images.MIME_TYPES[image_format], srcset))
+        else:
+            fallback = (largest, srcset)
+    if fallback is None:
+        return format_html(
+            '<img class="{}" src="{}" alt="{}" loading="lazy">',
+            css_class, image.url, alt
+        )
+    thumbnail, srcset = fallback
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}" alt="{}" loading="lazy"></picture>',
+        format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">',
+            ((mime, source_set, sizes) for mime, source_set in sources)
+        ),
+        css_class, thumbnail.url, srcset, sizes,
+        thumbnail.width, thumbnail.height, alt,
+    )
@@ -0,0 +1,271 @@
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.template import Context, Template
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+
+from . import images
+from .cache import SQLiteCache, TieredCache
+from .middleware import STICKY_COOKIE, ReplicaMiddleware
+from .routers import PrimaryReplicaRouter
+from .signals import check_connections
+from .views import media
+
+User = get_user_model()
+
+
+class MetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def timings(self, response):
+        return {
+            entry.split(';')[0]: entry
+            for entry in response['Server-Timing'].split(', ')
+        }
+
+    def test_server_timing_reports_layers(self):
+        timings = self.timings(self.guest_client.get(reverse('posts:index')))
+        for name in ('total', 'sql', 'template', 'cache'):
+            with self.subTest(name=name):
+                self.assertIn(name, timings)
+        self.assertIn('desc="1 calls"', timings['sql'])
+
+    def test_log_line_counts_cache_hits(self):
+        with self.assertLogs('core.metrics', 'INFO') as logs:
+            self.guest_client.get(reverse('posts:index'))
+            self.guest_client.get(reverse('posts:index'))
+        first, second = (record.metrics for record in logs.records)
+        self.assertEqual(first['path'], reverse('posts:index'))
+        self.assertEqual(first['sql_count'], 1)
+        self.assertEqual(second['sql_count'], 0)
+        self.assertGreater(second['cache_hits'], first['cache_hits'])
+
+    def test_slow_request_is_profiled(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(
+            REQUEST_PROFILE_DIR=directory,
+            REQUEST_PROFILE_SAMPLE_RATE=1,
+            REQUEST_METRICS_SLOW_MS=0,
+        ), self.assertLogs('core.metrics', 'WARNING'):
+            self.guest_client.get(self.url)
+        profiles = os.listdir(directory)
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].endswith('.prof'))
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # Два экземпляра с разными L1 над одним L2 — как два процесса.
+        params = {'OPTIONS': {'SHARED': 'shared', 'CHECK_INTERVAL': 0}}
+        self.first = TieredCache('first', params)
+        self.second = TieredCache('second', params)
+
+    def test_reads_are_served_from_l1(self):
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        # Удаление мимо TieredCache не попадает в журнал: L1 его не видит.
+        caches['shared'].delete('key')
+        self.assertEqual(self.second.get('key'), 'value')
+
+    def test_write_keeps_other_keys_in_l1(self):
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        caches['shared'].delete('key')
+        self.first.set('other', 'value')
+        self.first.add('lock', True)
+        self.assertEqual(self.second.get('key'), 'value')
+        self.assertEqual(self.second.get('other'), 'value')
+
+    def test_clear_in_other_process_invalidates_l1(self):
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+
+    def test_write_in_other_process_invalidates_l1(self):
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertEqual(self.second.get('key'), 'new')
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+
+    def test_counter_is_shared(self):
+        self.first.set('counter', 1)
+        self.assertEqual(self.second.get('counter'), 1)
+        self.first.incr('counter')
+        self.assertEqual(self.second.get('counter'), 2)
+
+    def test_l1_copy_expires_with_l2(self):
+        self.first.set('short', 'value', 0.1)
+        self.first.set('long', 'value', 0.1)
+        self.assertEqual(self.second.get_many(['short', 'long']), {
+            'short': 'value', 'long': 'value'
+        })
+        self.first.touch('long', 600)
+        self.assertEqual(self.second.get('long'), 'value')
+        caches['shared'].delete_many(['short', 'long'])
+        time.sleep(0.2)
+        self.assertIsNone(self.second.get('short'))
+        self.assertEqual(self.second.get('long'), 'value')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        location = os.path.join(directory, 'cache.sqlite3')
+        self.first = SQLiteCache(location, {})
+        self.second = SQLiteCache(location, {})
+
+    def test_values_are_shared(self):
+        self.first.set('key', {'a': 1})
+        self.assertEqual(self.second.get('key'), {'a': 1})
+        self.second.delete('key')
+        self.assertIsNone(self.first.get('key'))
+
+    def test_add_is_a_lock(self):
+        self.assertTrue(self.first.add('lock', True, 30))
+        self.assertFalse(self.second.add('lock', True, 30))
+        self.first.set('lock', True, -1)
+        self.assertTrue(self.second.add('lock', True, 30))
+
+    def test_incr(self):
+        self.first.set('counter', 1, None)
+        self.assertEqual(self.second.incr('counter', 5), 6)
+        with self.assertRaises(ValueError):
+            self.second.incr('missing')
+
+
+class DatabaseConnectionTests(TestCase):
+    @skipUnless(connection.vendor == 'sqlite', 'PRAGMA из SQLite')
+    def test_sqlite_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_broken_connection_is_closed_before_request(self):
+        broken = mock.Mock(
+            settings_dict={'CONN_HEALTH_CHECKS': True},
+            in_atomic_block=False,
+        )
+        broken.is_usable.return_value = False
+        unchecked = mock.Mock(settings_dict={})
+        with mock.patch(
+            'core.signals.connections.all', return_value=[broken, unchecked]
+        ):
+            check_connections()
+        broken.close.assert_called_once_with()
+        unchecked.is_usable.assert_not_called()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        aliases = []
+
+        def view(request):
+            aliases.append(self.router.db_for_read(Post))
+            if write:
+                self.router.db_for_write(Post)
+                aliases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        return ReplicaMiddleware(view)(request), aliases
+
+    def test_get_reads_replica_until_first_write(self):
+        response, aliases = self.route(self.factory.get('/'), write=True)
+        self.assertEqual(aliases, ['replica', 'default'])
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_post_and_sticky_client_read_primary(self):
+        response, aliases = self.route(self.factory.post('/'))
+        self.assertEqual(aliases, ['default'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.assertEqual(self.route(request)[1], ['default'])
+
+
+class PictureTagTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        overrides = override_settings(
+            MEDIA_ROOT=directory, THUMBNAIL_WORKERS=0,
+            RESPONSIVE_IMAGE_WIDTHS=(320, 640)
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache.clear()
+        content = BytesIO()
+        Image.new('RGB', (1200, 600), 'red').save(content, 'JPEG')
+        self.name = default_storage.save(
+            'posts/photo.jpg', ContentFile(content.getvalue())
+        )
+
+    def render(self, image):
+        return Template(
+            '{% load responsive %}'
+            '{% picture image "960x339" crop="center" css_class="card" %}'
+        ).render(Context({'image': image}))
+
+    def test_widths_keep_aspect_ratio(self):
+        self.assertEqual(
+            images.widths('960x339'),
+            [(320, '320x113'), (640, '640x226'), (960, '960x339')]
+        )
+
+    def test_picture_lists_every_width(self):
+        html = self.render(default_storage.open(self.name))
+        self.assertTrue(html.startswith('<picture>'))
+        for width in (320, 640, 960):
+            with self.subTest(width=width):
+                self.assertIn(f' {width}w', html)
+        self.assertIn('width="960" height="339"', html)
+        self.assertEqual(self.render(''), '')
+
+    def test_thumbnails_are_cached_for_a_year(self):
+        request = RequestFactory().get('/')
+        thumbnail = self.render(default_storage.open(self.name)).split(
+            'src="/media/'
+        )[1].split('"')[0]
+        response = media(request, thumbnail, settings.MEDIA_ROOT)
+        self.assertIn('immutable', response['Cache-Control'])
+        response = media(request, self.name, settings.MEDIA_ROOT)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.shortcuts import render
+from django.views.static import serve
 
 
 def page_not_found(request, exception):
@@ -11,3 +13,20 @@ def csrf_failure(request, reason=''):
 
 def server_error(request, reason=''):
     return render(request, 'core/500.html')
+
+
+def media(request, path, document_root=None):
+    """Раздача MEDIA_ROOT в DEBUG с Cache-Control из MEDIA_CACHE_CONTROL.
+
+    Берётся значение самого длинного подходящего префикса пути; веб-сервер
+    в продакшене должен отдавать те же заголовки.
+    """
+    response = serve(request, path, document_root=document_root)
+    prefix = max(
+        (prefix for prefix in settings.MEDIA_CACHE_CONTROL
+         if path.startswith(prefix)),
+        key=len, default=None
+    )
+    if prefix is not None:
+        response['Cache-Control'] = settings.MEDIA_CACHE_CONTROL[prefix]
+    return response
@@ -4,7 +4,8 @@ from .models import Comment, Follow, Group, Post
 
 
 class CommentAdmin(admin.ModelAdmin):
-    list_display = ('post', 'author', 'text',)
+    list_display = ('post', 'author', 'text', 'depth', 'replies_count',)
+    raw_id_fields = ('parent',)
     empty_value_display = '-пусто-'
 
 
@@ -19,7 +20,8 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'created', 'author', 'group',)
+    list_display = ('pk', 'text', 'created', 'author', 'group',
+                    'comments_count',)
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('created',)
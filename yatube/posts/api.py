@@ -0,0 +1,200 @@
+"""Read-only JSON API для мобильных клиентов.
+
+Списки постов листаются курсором (?cursor=) так же, как HTML-страницы.
+Ответы снабжаются строгим ETag и Last-Modified: валидаторы строятся по
+id и modified постов текущей страницы, которые выбираются одним запросом
+по индексу (created, id) без тяжёлых колонок. Если клиент прислал
+совпадающий If-None-Match, он получает 304 и остальная выборка не
+выполняется.
+"""
+from functools import wraps
+from hashlib import md5
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+
+from . import feed, threads
+from .models import Group, Post, User
+from .paginator import CursorPaginator
+
+COUNT: int = 10
+COMMENTS_COUNT: int = 50
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'created': post.created,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+    }
+
+
+def serialize_comment(comment):
+    data = {
+        'id': comment.pk,
+        'parent': comment.parent_id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+        'replies_count': comment.replies_count,
+    }
+    if hasattr(comment, 'thread'):
+        data['replies'] = [
+            serialize_comment(reply) for reply in comment.thread
+        ]
+    return data
+
+
+def api_response(data):
+    return JsonResponse(data, json_dumps_params=JSON_PARAMS)
+
+
+def login_required_api(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Требуется вход'}, status=401,
+                json_dumps_params=JSON_PARAMS
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def post_list_view(scope, exists=None, paginator=None):
+    """Строит view списка из scope(request, **kwargs) -> QuerySet постов.
+
+    exists(**kwargs) проверяет владельца списка (группу, автора) и
+    вызывается, только когда страница пуста. paginator(request, **kwargs)
+    заменяет CursorPaginator по scope для списков, которые не выбираются
+    одним запросом.
+    """
+
+    def page_keys(request, kwargs):
+        # Страница только с pk, created и modified: её используют и
+        # валидаторы, и сама view, поэтому выборка одна на запрос.
+        if not hasattr(request, 'api_page'):
+            if paginator is None:
+                pages = CursorPaginator(
+                    scope(request, **kwargs).only(
+                        'pk', 'created', 'modified'
+                    ),
+                    COUNT
+                )
+            else:
+                pages = paginator(request, **kwargs)
+            request.api_page = pages.get_page(request.GET.get('cursor'))
+        return request.api_page
+
+    def etag(request, **kwargs):
+        page = page_keys(request, kwargs)
+        if not page.object_list:
+            return None
+        state = ','.join(
+            f'{post.pk}:{post.modified.isoformat()}' for post in page
+        )
+        cursor = request.GET.get('cursor', '')
+        return md5(f'{cursor}|{state}'.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        page = page_keys(request, kwargs)
+        return max((post.modified for post in page), default=None)
+
+    @require_safe
+    @cache_control(no_cache=True)
+    @condition(etag_func=etag, last_modified_func=last_modified)
+    def view(request, **kwargs):
+        page = page_keys(request, kwargs)
+        if not page.object_list and exists and not exists(**kwargs):
+            raise Http404
+        ids = [post.pk for post in page]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return api_response({
+            'results': [
+                serialize_post(posts[pk]) for pk in ids if pk in posts
+            ],
+            'next': page.next_cursor or None,
+            'previous': page.previous_cursor or None,
+        })
+
+    return view
+
+
+def index_scope(request):
+    return Post.objects.all()
+
+
+def group_scope(request, slug):
+    return Post.objects.filter(group__slug=slug)
+
+
+def group_exists(slug):
+    return Group.objects.filter(slug=slug).exists()
+
+
+def profile_scope(request, username):
+    return Post.objects.filter(author__username=username)
+
+
+def profile_exists(username):
+    return User.objects.filter(username=username).exists()
+
+
+def follow_paginator(request):
+    return feed.FeedPaginator(request.user, COUNT)
+
+
+index = post_list_view(index_scope)
+group_posts = post_list_view(group_scope, group_exists)
+profile = post_list_view(profile_scope, profile_exists)
+follow_index = login_required_api(
+    cache_control(private=True)(
+        post_list_view(None, paginator=follow_paginator)
+    )
+)
+
+
+def post_modified(request, post_id):
+    if not hasattr(request, 'api_modified'):
+        request.api_modified = Post.objects.filter(pk=post_id).values_list(
+            'modified', flat=True
+        ).first()
+    return request.api_modified
+
+
+def post_etag(request, post_id):
+    modified = post_modified(request, post_id)
+    if modified is None:
+        return None
+    cursor = request.GET.get('comments', '')
+    return md5(
+        f'{post_id}:{modified.isoformat()}|{cursor}'.encode()
+    ).hexdigest()
+
+
+@require_safe
+@cache_control(no_cache=True)
+@condition(etag_func=post_etag, last_modified_func=post_modified)
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    comments = CursorPaginator(
+        post.comments.filter(depth=0).select_related('author'),
+        COMMENTS_COUNT
+    ).get_page(request.GET.get('comments'))
+    return api_response(dict(
+        serialize_post(post),
+        comments=[
+            serialize_comment(comment)
+            for comment in threads.attach_replies(comments)
+        ],
+        comments_next=comments.next_cursor or None,
+    ))
@@ -0,0 +1,188 @@
+"""Кэш страниц, привязанный к версиям контента.
+
+Версия — счётчик в кэше, который увеличивается при изменении данных и
+ещё раз после их коммита (см. bump_on_commit). Ключ страницы включает
+версию, поэтому изменения видны сразу, а сами страницы можно хранить
+долго. Пока один воркер пересобирает страницу новой версии, остальные
+отдают последнюю собранную копию. Страница собирается по реплике, если
+её версии не менялись дольше, чем реплики могут отставать.
+"""
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from core import routers
+
+VERSION_KEY: str = 'version:{}'
+RECENT_KEY: str = '{}:recent'
+LOCK_TIMEOUT: int = 30
+
+
+def _initial_version():
+    # Время в миллисекундах не совпадёт с версией, под которой могли
+    # остаться страницы, если сам счётчик вытеснили из кэша.
+    return int(time.time() * 1000)
+
+
+def _version_key(name):
+    # Имена версий содержат slug и username, которые не всякий бэкенд
+    # кэша примет в ключе.
+    return VERSION_KEY.format(md5(name.encode()).hexdigest())
+
+
+def get_version(name):
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    key = _version_key(name)
+    if settings.DATABASE_REPLICAS:
+        cache.set(
+            RECENT_KEY.format(key), True, settings.REPLICA_STICKY_SECONDS
+        )
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_on_commit(*names):
+    """Увеличивает версии names сразу и ещё раз после коммита.
+
+    Между ними параллельный запрос может собрать страницу по ещё старым
+    строкам под новой версией. Вторая версия оставляет такую страницу
+    под промежуточным ключом, который больше никто не прочитает.
+    """
+    def bump():
+        for name in names:
+            bump_version(name)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def replica_reads(names):
+    """Разрешает чтение с реплик, если версии names давно не менялись.
+
+    Реплика отстаёт не дольше REPLICA_STICKY_SECONDS. Пока версия
+    моложе, реплика может не видеть изменения, под которое она выдана,
+    и страница с ETag этой версии читается по основной базе. Запрет
+    middleware (запись, липкий клиент) не снимается.
+    """
+    allowed = routers.replicas_allowed()
+    if allowed and names and settings.DATABASE_REPLICAS:
+        allowed = not cache.get_many(
+            [RECENT_KEY.format(_version_key(name)) for name in names]
+        )
+    return routers.replica_reads(allowed)
+
+
+def group_version(slug):
+    return f'group:{slug}'
+
+
+def author_version(username):
+    return f'author:{username}'
+
+
+def post_version(pk):
+    return f'post:{pk}'
+
+
+def follows_version(user):
+    return f'follows:{user}'
+
+
+def image_version(name):
+    return f'image:{name}'
+
+
+def _page(request, view_name, names):
+    """Основа ключа страницы, её текущие версии и ETag."""
+    versions = '.'.join(str(get_version(name)) for name in names)
+    path = md5(request.get_full_path().encode()).hexdigest()
+    variant = request.user.pk or 'anon'
+    base = f'page:{view_name}:{variant}:{path}'
+    # Формы на странице несут CSRF-токен из cookie: с новой cookie
+    # браузер должен получить страницу заново.
+    csrf = request.META.get('CSRF_COOKIE', '')
+    etag = quote_etag(md5(f'{base}:{versions}:{csrf}'.encode()).hexdigest())
+    return base, versions, etag
+
+
+def page_etag(request, view_name, *names):
+    """ETag страницы из текущих версий names и вошедшего пользователя."""
+    return _page(request, view_name, names)[2]
+
+
+def with_etag(response, etag):
+    """Проставляет ETag успешному ответу или 304."""
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def versioned_cache_page(*names, timeout=None):
+    """Кэширует GET-ответы view под текущими версиями names.
+
+    Имя версии может ссылаться на параметры URL: 'group:{slug}' даёт
+    каждой группе свою версию, а {user} — на id вошедшего пользователя.
+    Анонимы делят одну копию страницы,
+    вошедшие пользователи получают свою: в шапке выводится имя
+    пользователя. Ответ несёт ETag из тех же версий, и условный GET
+    получает 304 без обращения к кэшу страниц.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            page_names = [
+                name.format(user=request.user.pk, **kwargs) for name in names
+            ]
+            base, versions, etag = _page(request, view.__name__, page_names)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return with_etag(not_modified, etag)
+            key = f'{base}:{versions}'
+            lock = f'{base}:lock'
+            latest = f'{base}:latest'
+            content = cache.get(key)
+            if content is not None:
+                return with_etag(HttpResponse(content), etag)
+            locked = cache.add(lock, True, LOCK_TIMEOUT)
+            content = None if locked else cache.get(latest)
+            if content is not None:
+                # Прошлая копия отдаётся без ETag: он уже от новых версий.
+                response = HttpResponse(content)
+                patch_vary_headers(response, ('Cookie',))
+                return response
+            try:
+                with replica_reads(page_names):
+                    response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    cache.set_many(
+                        {key: response.content, latest: response.content},
+                        timeout or settings.PAGE_CACHE_TIMEOUT
+                    )
+            finally:
+                if locked:
+                    cache.delete(lock)
+            return with_etag(response, etag)
+        return wrapper
+    return decorator
@@ -0,0 +1,52 @@
+"""Расчёт рекомендаций по совместным подпискам на NumPy и SciPy.
+
+Подписки — разреженная матрица A (подписчик × автор) в формате CSR.
+Для пачки строк A_p оценки авторов считаются как (A_p · Aᵀ) · A:
+каждый читатель голосует за свои подписки с весом, равным числу его
+общих подписок с пользователем. Модуль импортируется только командой
+build_recommendations, view обходятся без NumPy и SciPy.
+"""
+import numpy as np
+from scipy import sparse
+
+
+def follow_matrix(pairs):
+    """Матрица подписок и отсортированные id пользователей её осей.
+
+    pairs — массив формы (n, 2) из пар (подписчик, автор).
+    """
+    ids, index = np.unique(pairs, return_inverse=True)
+    index = index.reshape(-1, 2)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(index), dtype=np.float32), (index[:, 0], index[:, 1])),
+        shape=(len(ids), len(ids)),
+    )
+    return matrix, ids
+
+
+def chunk_scores(matrix, start, stop):
+    """Оценки авторов для строк start:stop без себя и своих подписок."""
+    chunk = matrix[start:stop]
+    scores = (chunk @ matrix.T) @ matrix
+    own = sparse.eye(stop - start, matrix.shape[1], k=start, format='csr')
+    known = ((chunk + own) > 0).astype(np.float32)
+    scores = (scores - scores.multiply(known)).tocsr()
+    scores.eliminate_zeros()
+    return scores
+
+
+def top_k(scores, k):
+    """Для каждой строки — до k столбцов с наибольшей оценкой.
+
+    Выдаёт (строка, столбцы, оценки) по убыванию оценки; при равных
+    оценках раньше идёт меньший столбец.
+    """
+    for row in range(scores.shape[0]):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        values = scores.data[start:end]
+        columns = scores.indices[start:end]
+        if len(values) > k:
+            best = np.argpartition(-values, k)[:k]
+            values, columns = values[best], columns[best]
+        order = np.lexsort((columns, -values))
+        yield row, columns[order], values[order]
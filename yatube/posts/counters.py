@@ -0,0 +1,115 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются из posts.signals в той же транзакции, что и сами
+записи (view и админка работают внутри transaction.atomic). Команда
+reconcile_counters пересчитывает их, если они разошлись с данными.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+from django.utils import timezone
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+BATCH_SIZE: int = 500
+
+
+def stats_for(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def _change(queryset, field, delta, **changes):
+    # Счётчик не уходит ниже нуля, даже если уже разошёлся с данными.
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta}, **changes)
+
+
+def change_author(user_id, field, delta):
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if not _change(stats, field, delta) and delta > 0:
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        _change(stats, field, delta)
+
+
+def change_comments(post_id, delta):
+    # Число комментариев отдаёт API, поэтому пост считается изменённым:
+    # по modified строятся валидаторы API.
+    _change(
+        Post.objects.filter(pk=post_id), 'comments_count', delta,
+        modified=timezone.now()
+    )
+
+
+def change_replies(ancestor_ids, delta):
+    # replies_count — ответы во всём поддереве, поэтому меняется у всех
+    # предков комментария, а не только у родителя.
+    _change(
+        Comment.objects.filter(pk__in=ancestor_ids), 'replies_count', delta
+    )
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def _count_replies():
+    return Coalesce(Subquery(
+        Comment.objects.filter(
+            post=OuterRef('post'),
+            path__gt=OuterRef('path'),
+            path__lt=Concat(OuterRef('path'), Value('~')),
+        ).order_by().values('post').annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def _reconcile(queryset, field, actual):
+    drifted = list(
+        queryset.annotate(actual=actual)
+        .exclude(**{field: F('actual')})
+        .values_list('pk', flat=True)
+    )
+    for start in range(0, len(drifted), BATCH_SIZE):
+        queryset.filter(
+            pk__in=drifted[start:start + BATCH_SIZE]
+        ).update(**{field: actual})
+    return len(drifted)
+
+
+def reconcile():
+    """Пересчитывает все счётчики, возвращает число исправлений по полям."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk) for pk in missing], batch_size=BATCH_SIZE
+    )
+    stats = AuthorStats.objects.all()
+    return {
+        'posts_count': _reconcile(
+            stats, 'posts_count', _count(Post.objects, 'author')
+        ),
+        'followers_count': _reconcile(
+            stats, 'followers_count', _count(Follow.objects, 'author')
+        ),
+        'following_count': _reconcile(
+            stats, 'following_count', _count(Follow.objects, 'user')
+        ),
+        'comments_count': _reconcile(
+            Post.objects.all(), 'comments_count',
+            _count(Comment.objects, 'post')
+        ),
+        'replies_count': _reconcile(
+            Comment.objects.all(), 'replies_count', _count_replies()
+        ),
+    }
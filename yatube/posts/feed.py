@@ -0,0 +1,139 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается по лентам подписчиков автора, подписка
+дозаполняет ленту постами автора, отписка вычищает их. Посты
+популярных авторов (подписчиков не меньше FEED_FANOUT_LIMIT) в ленты
+не раскладываются и помечаются fanned_out=False, а подмешиваются при
+чтении. Решение принимается один раз, при публикации: если автор потом
+перейдёт порог в любую сторону, его прежние посты остаются там, где
+были, и не теряются из лент.
+
+Страница ленты (FeedPaginator) — два запроса с LIMIT: записи ленты по
+индексу (user, created, post) и нераскладываемые посты подписок по
+индексу (fanned_out, created, id). Оба листаются тем же курсором по
+(created, id), что и остальные списки постов.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import AuthorStats, FeedEntry, Follow, Post
+from .paginator import CursorPaginator
+
+BATCH_SIZE: int = 500
+
+
+def fanout_limit():
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+
+
+def is_celebrity(author_id):
+    return AuthorStats.objects.filter(
+        user_id=author_id, followers_count__gte=fanout_limit()
+    ).exists()
+
+
+def followed_ids(user):
+    return Follow.objects.filter(user=user).values('author')
+
+
+def _push(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, BATCH_SIZE))
+    while batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, BATCH_SIZE))
+
+
+def fan_out(post):
+    if is_celebrity(post.author_id):
+        post.fanned_out = False
+        Post.objects.filter(pk=post.pk).update(fanned_out=False)
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _push(
+        FeedEntry(user_id=user_id, post=post, created=post.created)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user, author):
+    # Нераскладываемые посты и так подмешиваются при чтении.
+    posts = author.posts.filter(fanned_out=True).values_list('pk', 'created')
+    _push(
+        FeedEntry(user=user, post_id=post_id, created=created)
+        for post_id, created in posts.iterator()
+    )
+
+
+def prune(user, author):
+    FeedEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def rebuild(user):
+    FeedEntry.objects.filter(user=user).delete()
+    for follow in Follow.objects.filter(user=user).select_related('author'):
+        backfill(user, follow.author)
+
+
+def unfanned_posts(user):
+    """Нераскладываемые посты авторов, на которых подписан user."""
+    return Post.objects.filter(fanned_out=False, author__in=followed_ids(user))
+
+
+def feed_for(user):
+    """Вся лента user одним QuerySet — для нумерованных страниц."""
+    fanned_out = FeedEntry.objects.filter(user=user).values('post')
+    return Post.objects.filter(
+        Q(pk__in=fanned_out)
+        | Q(fanned_out=False, author__in=followed_ids(user))
+    )
+
+
+class FeedPaginator(CursorPaginator):
+    """Курсорная пагинация ленты без выборки и сортировки её целиком.
+
+    Окно страницы берётся из двух источников, каждый запросом с LIMIT
+    по своему индексу, и сливается в памяти по (created, id).
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(feed_for(user), per_page)
+        self.user = user
+
+    def _window(self, created, pk, backward):
+        direction = 'gt' if backward else 'lt'
+        prefix = '' if backward else '-'
+        entries = FeedEntry.objects.filter(user=self.user).select_related(
+            'post__author', 'post__group'
+        )
+        posts = unfanned_posts(self.user).select_related('author', 'group')
+        if created is not None:
+            entries = entries.filter(
+                Q(**{f'created__{direction}': created})
+                | Q(created=created, **{f'post_id__{direction}': pk})
+            )
+            posts = posts.filter(
+                Q(**{f'created__{direction}': created})
+                | Q(created=created, **{f'pk__{direction}': pk})
+            )
+        entries = entries.order_by(f'{prefix}created', f'{prefix}post_id')
+        posts = posts.order_by(f'{prefix}created', f'{prefix}pk')
+        limit = self.per_page + 1
+        window = {entry.post_id: entry.post for entry in entries[:limit]}
+        window.update((post.pk, post) for post in posts[:limit])
+        return sorted(
+            window.values(), key=lambda post: (post.created, post.pk),
+            reverse=not backward
+        )[:limit]
+
+    def _forward(self, created=None, pk=None):
+        items = self._window(created, pk, backward=False)
+        return items[:self.per_page], len(items) > self.per_page
+
+    def _backward(self, created, pk):
+        items = self._window(created, pk, backward=True)
+        return items[:self.per_page][::-1], len(items) > self.per_page
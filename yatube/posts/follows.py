@@ -0,0 +1,67 @@
+"""Граф подписок в кэше.
+
+Для каждого пользователя в кэше лежит отсортированный массив id
+авторов, на которых он подписан: array('q') в байтах, по 8 байт на
+подписку. Одна подписка проверяется бинарным поиском, авторы целой
+страницы — одним обращением к кэшу, без запросов к базе. Массив
+собирается одним запросом при первом обращении и кладётся через
+cache.add под версией пользователя. Подписка и отписка (posts.signals)
+не правят массив, а увеличивают версию сразу и ещё раз после коммита:
+следующее чтение соберёт его заново, а массив, собранный по базе до
+коммита, останется под промежуточной версией и не будет прочитан.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import bump_on_commit, get_version
+from .models import Follow
+
+KEY: str = 'follows:{}:{}'
+VERSION: str = 'follow_graph:{}'
+TYPECODE: str = 'q'
+
+
+def _key(user_id):
+    return KEY.format(user_id, get_version(VERSION.format(user_id)))
+
+
+def _contains(ids, author_id):
+    position = bisect_left(ids, author_id)
+    return position < len(ids) and ids[position] == author_id
+
+
+def followee_ids(user_id):
+    """Отсортированный массив id авторов, на которых подписан user_id."""
+    key = _key(user_id)
+    raw = cache.get(key)
+    if raw is None:
+        ids = array(TYPECODE, Follow.objects.filter(
+            user_id=user_id
+        ).order_by('author_id').values_list('author_id', flat=True))
+        cache.add(key, ids.tobytes(), settings.FOLLOW_GRAPH_TIMEOUT)
+        return ids
+    ids = array(TYPECODE)
+    ids.frombytes(raw)
+    return ids
+
+
+def is_following(user, author_id):
+    if not user.is_authenticated:
+        return False
+    return _contains(followee_ids(user.pk), author_id)
+
+
+def followed_among(user, author_ids):
+    """Те из author_ids, на кого подписан user."""
+    if not user.is_authenticated:
+        return set()
+    ids = followee_ids(user.pk)
+    return {author_id for author_id in author_ids if _contains(ids, author_id)}
+
+
+def changed(user_id):
+    """Сбрасывает массив user_id, когда подписка или отписка закоммичена."""
+    bump_on_commit(VERSION.format(user_id))
@@ -1,4 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
+from . import images
 from .models import Comment, Group, Post
 
 
@@ -24,6 +27,12 @@ class PostForm(forms.ModelForm):
             'group': 'Выберите группу, к которой относится пост',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return images.prepare(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     text = forms.CharField(
@@ -0,0 +1,116 @@
+"""Обработка картинок постов при загрузке.
+
+PostForm пропускает новую картинку через prepare(). Размер читается из
+заголовка без декодирования, и картинки больше POST_IMAGE_MAX_PIXELS
+(«бомбы» декомпрессии) отклоняются до того, как под пиксели выделена
+память. Остальные декодируются один раз — JPEG сразу в уменьшенном
+масштабе через draft() — и сохраняются мастер-копией не больше
+POST_IMAGE_MAX_SIDE по длинной стороне: без прозрачности в JPEG, с
+прозрачностью в WebP (или в PNG, если Pillow собран без WebP). EXIF,
+XMP и комментарии не переносятся, поворот из EXIF применяется к самим
+пикселям, ICC-профиль сохраняется. Небольшие картинки без метаданных
+остаются как есть. Результат пишется во временный файл, который
+уходит на диск, когда перерастает SPOOL_SIZE.
+"""
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps, features
+
+KEPT_FORMATS = frozenset({'JPEG', 'PNG', 'GIF', 'WEBP'})
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment', 'photoshop')
+ORIENTATION_TAG: int = 0x0112
+SPOOL_SIZE: int = 1024 * 1024
+
+
+def open_upload(upload):
+    if hasattr(upload, 'temporary_file_path'):
+        return Image.open(upload.temporary_file_path())
+    upload.seek(0)
+    return Image.open(upload)
+
+
+def has_metadata(image):
+    # text у PNG собирается из всех чанков, поэтому проверяется последним.
+    return (
+        any(key in image.info for key in METADATA_KEYS)
+        or bool(getattr(image, 'text', None))
+    )
+
+
+def can_keep(image, upload):
+    return (
+        image.format in KEPT_FORMATS
+        and max(image.size) <= settings.POST_IMAGE_MAX_SIDE
+        and upload.size <= settings.POST_IMAGE_KEEP_BYTES
+        and not has_metadata(image)
+    )
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def encode(image):
+    """Декодирует картинку и возвращает (файл мастер-копии, расширение)."""
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    icc_profile = image.info.get('icc_profile')
+    if image.format == 'JPEG':
+        image.draft('RGB', (max_side, max_side))
+    if image.getexif().get(ORIENTATION_TAG, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    options = {'icc_profile': icc_profile} if icc_profile else {}
+    if has_alpha(image):
+        image = image.convert('RGBA')
+        if features.check('webp'):
+            image_format, extension = 'WEBP', '.webp'
+            options.update(quality=settings.POST_IMAGE_QUALITY, method=4)
+        else:
+            image_format, extension = 'PNG', '.png'
+            options.update(optimize=True)
+    else:
+        image = image.convert('RGB')
+        image_format, extension = 'JPEG', '.jpg'
+        options.update(
+            quality=settings.POST_IMAGE_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+    output = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    image.save(output, image_format, **options)
+    output.seek(0)
+    return output, extension
+
+
+def prepare(upload):
+    """Проверяет загруженную картинку и возвращает файл для Post.image."""
+    try:
+        image = open_upload(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Загрузите корректное изображение', code='invalid_image'
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение слишком большое: %(width)s×%(height)s',
+            code='image_too_large',
+            params={'width': width, 'height': height},
+        )
+    if can_keep(image, upload):
+        upload.seek(0)
+        return upload
+    try:
+        output, extension = encode(image)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Загрузите корректное изображение', code='invalid_image'
+        )
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return File(output, name=stem + extension)
@@ -0,0 +1,55 @@
+import random
+import re
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.models import Post
+from posts.views import COUNT
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время поиска через индекс и через LIKE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def words(self, sample_size):
+        texts = Post.objects.order_by('?').values_list('text', flat=True)
+        words = [
+            word for text in texts[:200]
+            for word in re.findall(r'\w{4,}', text)
+        ]
+        return random.Random(self.seed).choices(words, k=sample_size)
+
+    def measure(self, backend, words):
+        timings = []
+        for word in words:
+            started = time.perf_counter()
+            results = backend.search(word)
+            results.count()
+            list(results[:COUNT])
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        self.seed = options['seed']
+        words = self.words(options['queries'])
+        if not words:
+            self.stderr.write('Нет постов для замера')
+            return
+        backends = {
+            'index': search.get_backend(),
+            'like': search.LikeSearchBackend(),
+        }
+        for name, backend in backends.items():
+            timings = sorted(self.measure(backend, words))
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f'{name:>5} ({type(backend).__name__}): '
+                f'среднее {statistics.mean(timings):.2f} мс, '
+                f'p95 {p95:.2f} мс'
+            )
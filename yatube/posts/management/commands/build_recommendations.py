@@ -0,0 +1,22 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации авторов по графу подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=recommendations.CHUNK_SIZE,
+            help='Сколько пользователей считать за один проход',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            created = recommendations.build(options['chunk_size'])
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        self.stdout.write(f'рекомендаций: {created}')
+        self.stdout.write(self.style.SUCCESS('Рекомендации пересчитаны'))
@@ -0,0 +1,75 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в каталог '
+        'в формате JSON Lines или CSV'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='jsonl'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную выгрузку с последней пачки'
+        )
+        parser.add_argument(
+            '--with-media', action='store_true',
+            help='Скопировать картинки постов в подкаталог media'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for transfer_class in transfer.TRANSFERS:
+            spec = transfer_class()
+            path = transfer.data_path(directory, spec, options['format'])
+            after = transfer.read_checkpoint(path) if options['resume'] else 0
+            if not after and os.path.exists(path):
+                os.remove(path)
+            total = spec.model.objects.count()
+            done = spec.model.objects.filter(pk__lte=after).count()
+            batch = []
+            for pk, row in spec.export_rows(after, options['batch_size']):
+                batch.append(row)
+                if len(batch) == options['batch_size']:
+                    done += self.flush(spec, path, batch, pk, options)
+                    batch = []
+                    self.progress(spec.name, done, total)
+            if batch:
+                done += self.flush(spec, path, batch, pk, options)
+            self.progress(spec.name, done, total, final=True)
+            paths.append(path)
+        # Отметки снимаются только в конце: при --resume уже выгруженные
+        # модели не перезаписываются заново.
+        for path in paths:
+            transfer.clear_checkpoint(path)
+        self.stdout.write(
+            self.style.SUCCESS(f'Данные выгружены в {directory}')
+        )
+
+    def flush(self, spec, path, batch, last_pk, options):
+        transfer.write_rows(path, list(spec.fields), batch)
+        if options['with_media']:
+            media = os.path.join(options['directory'], 'media')
+            for name in spec.images(batch):
+                transfer.export_image(name, media)
+        transfer.write_checkpoint(path, last_pk)
+        return len(batch)
+
+    def progress(self, label, done, total, final=False):
+        self.stdout.write(f'\r{label}: {done}/{total}', ending='')
+        if final:
+            self.stdout.write('')
+        self.stdout.flush()
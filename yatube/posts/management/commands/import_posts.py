@@ -0,0 +1,98 @@
+import os
+from itertools import islice
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import explicit_timestamps
+from posts import transfer
+from posts.cache import bump_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из каталога, '
+        'подготовленного export_posts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='jsonl'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Пропустить строки, загруженные прерванным запуском'
+        )
+        parser.add_argument(
+            '--media-root',
+            help='Откуда копировать картинки; по умолчанию <directory>/media'
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать неизвестных пользователей без пароля, '
+                 'а не пропускать их строки'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f'Каталог {directory} не найден')
+        self.media_root = (
+            options['media_root'] or os.path.join(directory, 'media')
+        )
+        self.versions = {'index'}
+        paths = []
+        for transfer_class in transfer.TRANSFERS:
+            spec = transfer_class(create_users=options['create_users'])
+            path = transfer.data_path(directory, spec, options['format'])
+            if not os.path.exists(path):
+                continue
+            self.load(spec, path, options)
+            paths.append(path)
+        for path in paths:
+            transfer.clear_checkpoint(path)
+
+        # bulk_create не отправляет сигналы: производные данные
+        # пересчитываются целиком.
+        self.stdout.write('Пересчёт производных данных')
+        for command in (
+            'reconcile_counters', 'rebuild_search_index', 'rebuild_feeds'
+        ):
+            call_command(command, stdout=self.stdout)
+        for name in self.versions:
+            bump_version(name)
+        self.stdout.write(self.style.SUCCESS('Данные загружены'))
+
+    def load(self, spec, path, options):
+        total = sum(1 for _ in transfer.read_rows(path))
+        done = transfer.read_checkpoint(path) if options['resume'] else 0
+        created = 0
+        rows = islice(transfer.read_rows(path), done, None)
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            with transaction.atomic(), explicit_timestamps(spec.model):
+                objects = spec.build(batch)
+                spec.model.objects.bulk_create(
+                    objects, ignore_conflicts=True
+                )
+                spec.link(batch)
+                self.versions.update(spec.versions(objects))
+            for name in spec.images(batch):
+                transfer.copy_image(name, self.media_root)
+            created += len(objects)
+            done += len(batch)
+            transfer.write_checkpoint(path, done)
+            self.progress(spec.name, done, total)
+        self.stdout.write('')
+        self.stdout.write(f'{spec.name}: добавлено {created}')
+
+    def progress(self, label, done, total):
+        self.stdout.write(f'\r{label}: {done}/{total}', ending='')
+        self.stdout.flush()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters, threads, trending
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок'
+
+    def handle(self, *args, **options):
+        # Комментарии из bulk_create приходят без path: replies_count
+        # считается по path, поэтому он дописывается первым.
+        self.stdout.write(f'path: дописано {threads.fill_paths()}')
+        for field, fixed in counters.reconcile().items():
+            self.stdout.write(f'{field}: исправлено {fixed}')
+        self.stdout.write(f'trending: пересчитано {trending.recompute()}')
+        self.stdout.write(self.style.SUCCESS('Счётчики сверены'))
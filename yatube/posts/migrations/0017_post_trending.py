@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:59
+
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_trending(apps, schema_editor):
+    # Оценка из публикации и комментариев, как в posts.trending.
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    epoch = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    tau = settings.TRENDING_HALF_LIFE / math.log(2)
+    scores = defaultdict(list)
+    for post_id, created in Comment.objects.values_list(
+        'post_id', 'created'
+    ).iterator():
+        scores[post_id].append((created - epoch).total_seconds() / tau)
+    posts = []
+    for pk, created in Post.objects.values_list('pk', 'created').iterator():
+        post_scores = scores.pop(pk, [])
+        post_scores.append((created - epoch).total_seconds() / tau)
+        peak = max(post_scores)
+        posts.append(Post(pk=pk, trending=peak + math.log(
+            sum(math.exp(score - peak) for score in post_scores)
+        )))
+    Post.objects.bulk_update(posts, ['trending'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-trending', '-id'], name='post_trending_idx'),
+        ),
+        migrations.RunPython(fill_trending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:08
+
+from django.db import migrations, models
+
+
+def mark_unfanned(apps, schema_editor):
+    # Пост без записей в лентах при живых подписчиках автора не был
+    # разложен: автор был популярным, когда его публиковал.
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    Follow = apps.get_model('posts', 'Follow')
+    Post.objects.exclude(
+        pk__in=FeedEntry.objects.values('post')
+    ).filter(
+        author__in=Follow.objects.values('author')
+    ).update(fanned_out=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_trending'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='feedentry',
+            name='feed_user_created_idx',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Разложен по лентам'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-created', '-post'], name='feed_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['fanned_out', '-created', '-id'], name='post_unfanned_created_idx'),
+        ),
+        migrations.RunPython(mark_unfanned, migrations.RunPython.noop),
+    ]
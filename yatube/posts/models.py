@@ -39,6 +39,27 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+    trending = models.FloatField(
+        'Популярность',
+        default=0,
+        editable=False
+    )
+    # False — пост популярного автора: в ленты подписчиков не разложен
+    # и подмешивается при чтении (posts.feed).
+    fanned_out = models.BooleanField(
+        'Разложен по лентам',
+        default=True,
+        editable=False
+    )
 
     def __str__(self):
         return self.text[:POST_CUT]
@@ -47,6 +68,28 @@ class Post(CreatedModel):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                name='post_author_created_idx',
+                fields=['author', '-created', '-id'],
+            ),
+            models.Index(
+                name='post_group_created_idx',
+                fields=['group', '-created', '-id'],
+            ),
+            models.Index(
+                name='post_created_idx',
+                fields=['-created', '-id'],
+            ),
+            models.Index(
+                name='post_trending_idx',
+                fields=['-trending', '-id'],
+            ),
+            models.Index(
+                name='post_unfanned_created_idx',
+                fields=['fanned_out', '-created', '-id'],
+            ),
+        ]
 
 
 class Comment(CreatedModel):
@@ -61,6 +104,29 @@ class Comment(CreatedModel):
         related_name='comments'
     )
     text = models.TextField()
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies'
+    )
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=255,
+        default='',
+        editable=False
+    )
+    depth = models.PositiveSmallIntegerField(
+        'Глубина',
+        default=0,
+        editable=False
+    )
+    replies_count = models.PositiveIntegerField(
+        'Ответов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.text
@@ -69,6 +135,16 @@ class Comment(CreatedModel):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Коментарии'
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                name='comment_post_created_idx',
+                fields=['post', 'depth', '-created', '-id'],
+            ),
+            models.Index(
+                name='comment_post_path_idx',
+                fields=['post', 'path'],
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -93,3 +169,85 @@ class Follow(models.Model):
                 fields=["user", "author"],
             ),
         ]
+        indexes = [
+            models.Index(
+                name='follow_author_user_idx',
+                fields=['author', 'user'],
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    def __str__(self):
+        return str(self.user)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ['-created']
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_feed_entry',
+                fields=['user', 'post'],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name='feed_user_created_idx',
+                fields=['user', '-created', '-post'],
+            ),
+        ]
+
+
+class Recommendation(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommended_to'
+    )
+    rank = models.PositiveSmallIntegerField('Место')
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        ordering = ['user', 'rank']
+        constraints = [
+            models.UniqueConstraint(
+                name='unique_recommendation_rank',
+                fields=['user', 'rank'],
+            ),
+        ]
@@ -0,0 +1,108 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT: str = 'n'
+PREVIOUS: str = 'p'
+
+
+def encode_cursor(direction, obj):
+    raw = f'{direction}:{obj.created.isoformat()}:{obj.pk}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, created, pk) или None для битого курсора."""
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, rest = raw.split(':', 1)
+        created, pk = rest.rsplit(':', 1)
+        created, pk = parse_datetime(created), int(pk)
+    except (DecodeError, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or created is None:
+        return None
+    return direction, created, pk
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (created, id): без OFFSET и без COUNT(*).
+
+    Страницы остаются обычными Page: номер страницы условный (1 для
+    первой, 2 для остальных), а num_pages показывает, есть ли следующая,
+    поэтому has_next/has_previous работают как у Paginator. Токены
+    соседних страниц лежат в page.next_cursor и page.previous_cursor.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list.order_by('-created', '-pk'), per_page)
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def get_page(self, cursor):
+        key = decode_cursor(cursor) if cursor else None
+        if key is None:
+            items, has_next = self._forward()
+            has_previous = False
+        elif key[0] == NEXT:
+            items, has_next = self._forward(*key[1:])
+            has_previous = True
+        else:
+            items, has_previous = self._backward(*key[1:])
+            if not items:
+                return self.get_page(None)
+            has_next = True
+        number = 2 if has_previous else 1
+        self._num_pages = number + has_next
+        page = Page(items, number, self)
+        page.next_cursor = encode_cursor(NEXT, items[-1]) if has_next else ''
+        page.previous_cursor = (
+            encode_cursor(PREVIOUS, items[0]) if has_previous else ''
+        )
+        return page
+
+    def _forward(self, created=None, pk=None):
+        queryset = self.object_list
+        if created is not None:
+            queryset = queryset.filter(
+                Q(created__lt=created) | Q(created=created, pk__lt=pk)
+            )
+        items = list(queryset[:self.per_page + 1])
+        return items[:self.per_page], len(items) > self.per_page
+
+    def _backward(self, created, pk):
+        items = list(
+            self.object_list.filter(
+                Q(created__gt=created) | Q(created=created, pk__gt=pk)
+            ).order_by('created', 'pk')[:self.per_page + 1]
+        )
+        has_previous = len(items) > self.per_page
+        return items[:self.per_page][::-1], has_previous
+
+
+def get_page(request, object_list, per_page, cursor_paginator=None):
+    """Страница списка постов в режиме settings.POSTS_PAGINATION.
+
+    Старые ссылки вида ?page=N продолжают работать через Paginator.
+    cursor_paginator заменяет CursorPaginator по object_list, если
+    список собирается не одним запросом.
+    """
+    numbered = (
+        settings.POSTS_PAGINATION == 'numbered'
+        or ('page' in request.GET and 'cursor' not in request.GET)
+    )
+    if numbered:
+        return Paginator(object_list, per_page).get_page(
+            request.GET.get('page')
+        )
+    if cursor_paginator is None:
+        cursor_paginator = CursorPaginator(object_list, per_page)
+    return cursor_paginator.get_page(request.GET.get('cursor'))
@@ -0,0 +1,104 @@
+"""Рекомендации «кого почитать» по графу подписок.
+
+Команда build_recommendations пересчитывает их пачками по CHUNK_SIZE
+пользователей (posts.cofollow): в памяти одновременно лежат только
+матрица подписок и оценки одной пачки. Лучшие TOP_K авторов каждого
+пользователя пишутся в таблицу Recommendation, и view читают их одним
+запросом по индексу (user, rank). Авторы, на которых пользователь
+подписался уже после расчёта, отсеиваются по графу подписок в кэше.
+"""
+from itertools import chain
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+from . import follows
+from .cache import bump_version
+from .models import Follow, Recommendation
+
+TOP_K: int = 20
+SHOWN: int = 5
+CHUNK_SIZE: int = 1000
+BATCH_SIZE: int = 500
+VERSION: str = 'recommendations'
+
+
+def for_user(user, limit=SHOWN):
+    """Авторы из последнего расчёта, на которых user ещё не подписан."""
+    if not user.is_authenticated:
+        return []
+    recommended = list(
+        Recommendation.objects.filter(user=user)
+        .select_related('author')[:TOP_K]
+    )
+    if not recommended:
+        return []
+    followed = follows.followed_among(
+        user, [recommendation.author_id for recommendation in recommended]
+    )
+    return [
+        recommendation.author for recommendation in recommended
+        if recommendation.author_id not in followed
+    ][:limit]
+
+
+def _replace(lower, upper, recommendations):
+    # Пачка владеет диапазоном id [lower, upper): так удаляются и
+    # рекомендации тех, кто с прошлого расчёта отписался ото всех.
+    stale = Recommendation.objects.all()
+    if lower is not None:
+        stale = stale.filter(user_id__gte=lower)
+    if upper is not None:
+        stale = stale.filter(user_id__lt=upper)
+    with transaction.atomic():
+        stale.delete()
+        Recommendation.objects.bulk_create(
+            recommendations, batch_size=BATCH_SIZE
+        )
+
+
+def build(chunk_size=CHUNK_SIZE, top_k=TOP_K):
+    """Пересчитывает таблицу Recommendation; возвращает число строк."""
+    try:
+        import numpy as np
+
+        from . import cofollow
+    except ImportError:
+        raise ImproperlyConfigured(
+            'Для рекомендаций нужны numpy и scipy '
+            '(pip install -r requirements-batch.txt)'
+        )
+    pairs = np.fromiter(
+        chain.from_iterable(
+            Follow.objects.values_list('user_id', 'author_id').iterator()
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    if not len(pairs):
+        _replace(None, None, [])
+        bump_version(VERSION)
+        return 0
+    matrix, ids = cofollow.follow_matrix(pairs)
+    created = 0
+    for start in range(0, len(ids), chunk_size):
+        stop = min(start + chunk_size, len(ids))
+        recommendations = [
+            Recommendation(
+                user_id=int(ids[start + row]),
+                author_id=int(ids[column]),
+                rank=rank,
+                score=float(score),
+            )
+            for row, columns, scores in cofollow.top_k(
+                cofollow.chunk_scores(matrix, start, stop), top_k
+            )
+            for rank, (column, score) in enumerate(zip(columns, scores), 1)
+        ]
+        _replace(
+            int(ids[start]) if start else None,
+            int(ids[stop]) if stop < len(ids) else None,
+            recommendations,
+        )
+        created += len(recommendations)
+    bump_version(VERSION)
+    return created
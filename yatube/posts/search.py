@@ -0,0 +1,149 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд задаётся настройкой POSTS_SEARCH_BACKEND; по умолчанию на SQLite
+используется индекс FTS5, на остальных базах — LIKE по тексту. Индекс
+обновляется из posts.signals при сохранении и удалении постов.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+FTS_TABLE: str = 'posts_post_fts'
+BATCH_SIZE: int = 500
+
+
+class SearchResults:
+    """Ленивый ранжированный список постов для Paginator."""
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+
+    def count(self):
+        return self.backend.count(self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.backend.ranked_ids(
+            self.query, index.start or 0, index.stop - (index.start or 0)
+        )
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class SearchBackend:
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def count(self, query):
+        raise NotImplementedError
+
+    def ranked_ids(self, query, offset, limit):
+        raise NotImplementedError
+
+    def search(self, query):
+        return SearchResults(self, query)
+
+
+class LikeSearchBackend(SearchBackend):
+    """Поиск подстроки без индекса: запасной вариант для любой базы."""
+
+    def _filter(self, query):
+        return Post.objects.filter(text__icontains=query.strip())
+
+    def count(self, query):
+        return self._filter(query).count()
+
+    def ranked_ids(self, query, offset, limit):
+        return list(
+            self._filter(query).order_by('-created', '-pk')
+            .values_list('pk', flat=True)[offset:offset + limit]
+        )
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """Инвертированный индекс FTS5 с ранжированием по bm25."""
+
+    @staticmethod
+    def match_expression(query):
+        # Каждое слово — отдельная фраза с поиском по префиксу, чтобы
+        # синтаксис FTS5 во вводе пользователя не ломал запрос.
+        return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+    def index(self, post):
+        self.remove(post.pk)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            rows = Post.objects.order_by().values_list('pk', 'text')
+            batch = []
+            for row in rows.iterator(chunk_size=BATCH_SIZE):
+                batch.append(row)
+                if len(batch) == BATCH_SIZE:
+                    self._insert(cursor, batch)
+                    batch = []
+            self._insert(cursor, batch)
+
+    def _insert(self, cursor, rows):
+        if rows:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                rows
+            )
+
+    def count(self, query):
+        match = self.match_expression(query)
+        if not match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s', [match]
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, offset, limit):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s', [match, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_backend():
+    path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSSearchBackend()
+    return LikeSearchBackend()
@@ -0,0 +1,236 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counters, feed, follows, search, threads, trending
+from .cache import (
+    author_version, bump_on_commit, follows_version, group_version,
+    post_version
+)
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_feeds(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.backfill(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    feed.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def reset_follow_graph(sender, instance, **kwargs):
+    follows.changed(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_index_version(sender, **kwargs):
+    bump_on_commit('index')
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, **kwargs):
+    instance._saved_group_id = None
+    if instance.pk is not None and not raw:
+        instance._saved_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', flat=True).first()
+        )
+
+
+def bump_author_versions(*user_ids):
+    bump_on_commit(*(
+        author_version(username) for username in
+        User.objects.filter(pk__in=user_ids).values_list(
+            'username', flat=True
+        )
+    ))
+
+
+# Страницы групп и профилей кэшируются под своими версиями: пост
+# меняет свою страницу, страницу своего автора и групп, в которых он
+# был и стал.
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_page_versions(sender, instance, **kwargs):
+    bump_on_commit(post_version(instance.pk))
+    group_ids = {instance.group_id, getattr(instance, '_saved_group_id', None)}
+    for slug in Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    ):
+        bump_on_commit(group_version(slug))
+    bump_author_versions(instance.author_id)
+
+
+@receiver(pre_save, sender=Group)
+def remember_slug(sender, instance, raw=False, **kwargs):
+    instance._saved_slug = None
+    if instance.pk is not None and not raw:
+        instance._saved_slug = (
+            Group.objects.filter(pk=instance.pk)
+            .values_list('slug', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def bump_group_version(sender, instance, created=False, **kwargs):
+    for slug in {instance.slug, getattr(instance, '_saved_slug', None)}:
+        if slug:
+            bump_on_commit(group_version(slug))
+    # Название и ссылка группы выводятся в карточках постов на профилях.
+    if not created:
+        bump_author_versions(*Post.objects.filter(
+            group=instance
+        ).values_list('author_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_page_version(sender, instance, **kwargs):
+    bump_on_commit(post_version(instance.post_id))
+
+
+# Счётчики подписок выводятся в профилях обоих пользователей, а
+# отметки подписки — в карточках на страницах подписчика.
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_page_versions(sender, instance, **kwargs):
+    bump_author_versions(instance.user_id, instance.author_id)
+    bump_on_commit(follows_version(instance.user_id))
+
+
+# Карточка поста в includes/post.html кэшируется по Post.modified,
+# поэтому изменения группы, имени и логина автора отмечаются в его
+# постах.
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def touch_group_posts(sender, instance, created=False, **kwargs):
+    if not created:
+        Post.objects.filter(group=instance).update(modified=timezone.now())
+
+
+@receiver(pre_save, sender=User)
+def remember_full_name(sender, instance, update_fields=None, **kwargs):
+    instance._saved_full_name = None
+    if instance.pk is None or (
+        update_fields is not None
+        and not set(NAME_FIELDS) & set(update_fields)
+    ):
+        return
+    instance._saved_full_name = (
+        User.objects.filter(pk=instance.pk)
+        .values_list(*NAME_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_author_posts(sender, instance, created, **kwargs):
+    saved = getattr(instance, '_saved_full_name', None)
+    if saved is None:
+        return
+    if saved != tuple(getattr(instance, field) for field in NAME_FIELDS):
+        Post.objects.filter(author=instance).update(modified=timezone.now())
+        bump_on_commit('index')
+        # Профиль кэшируется по username, и при смене логина старый
+        # адрес тоже должен перестать отдаваться из кэша.
+        for username in {saved[0], instance.username}:
+            bump_on_commit(author_version(username))
+        for slug in Group.objects.filter(
+            posts__author=instance
+        ).distinct().values_list('slug', flat=True):
+            bump_on_commit(group_version(slug))
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_author(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_author(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(pre_save, sender=Post)
+def score_new_post(sender, instance, raw=False, **kwargs):
+    if instance._state.adding and not raw:
+        instance.trending = trending.event_score(
+            instance.created or timezone.now()
+        )
+
+
+@receiver(post_save, sender=Comment)
+def score_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        trending.record(instance.post_id, instance.created)
+
+
+@receiver(post_save, sender=Comment)
+def thread_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        threads.attach(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_reply(sender, instance, **kwargs):
+    counters.change_replies(threads.ancestor_ids(instance.path), -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_author(instance.author_id, 'followers_count', 1)
+        counters.change_author(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_author(instance.author_id, 'followers_count', -1)
+    counters.change_author(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or 'text' in update_fields):
+        search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
@@ -0,0 +1,13 @@
+from django import template
+
+from ..cache import get_version, image_version
+
+register = template.Library()
+
+
+@register.filter
+def thumbnails_version(image):
+    """Версия миниатюр картинки для ключа кэша карточки поста."""
+    if not image:
+        return ''
+    return get_version(image_version(image.name))
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for post_index in range(13):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Тестовый пост {post_index}',
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_lists_are_paged_by_cursor(self):
+        urls = {
+            reverse('posts:api_index'): self.guest_client,
+            reverse('posts:api_group_list', args=['test-slug']):
+                self.guest_client,
+            reverse('posts:api_profile', args=['auth']): self.guest_client,
+            reverse('posts:api_follow_index'): self.authorized_client,
+        }
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                first = client.get(url).json()
+                self.assertEqual(len(first['results']), 10)
+                self.assertEqual(first['results'][0]['id'], self.post.pk)
+                self.assertIsNone(first['previous'])
+                second = client.get(url, {'cursor': first['next']}).json()
+                self.assertEqual(len(second['results']), 3)
+                self.assertIsNone(second['next'])
+
+    def test_post_detail_includes_comments(self):
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        data = self.guest_client.get(
+            reverse('posts:api_post_detail', args=[self.post.pk])
+        ).json()
+        self.assertEqual(data['author'], 'auth')
+        self.assertEqual(data['group'], 'test-slug')
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий')
+
+    def test_unknown_owner_and_guest_feed(self):
+        self.assertEqual(self.guest_client.get(
+            reverse('posts:api_group_list', args=['nope'])
+        ).status_code, 404)
+        self.assertEqual(self.guest_client.get(
+            reverse('posts:api_post_detail', args=[0])
+        ).status_code, 404)
+        self.assertEqual(self.guest_client.get(
+            reverse('posts:api_follow_index')
+        ).status_code, 401)
+
+    def test_unchanged_feed_answers_304_with_one_query(self):
+        url = reverse('posts:api_index')
+        etag = self.guest_client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+    def test_validators_change_with_content(self):
+        url = reverse('posts:api_index')
+        detail_url = reverse('posts:api_post_detail', args=[self.post.pk])
+        etag = self.guest_client.get(url)['ETag']
+        detail_etag = self.guest_client.get(detail_url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        for changed_url, old_etag in (
+            (url, etag), (detail_url, detail_etag)
+        ):
+            with self.subTest(url=changed_url):
+                response = self.guest_client.get(
+                    changed_url, HTTP_IF_NONE_MATCH=old_etag
+                )
+                self.assertEqual(response.status_code, 200)
+        Post.objects.filter(pk=self.post.pk).delete()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
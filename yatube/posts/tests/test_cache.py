@@ -0,0 +1,293 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import routers
+from core.middleware import STICKY_COOKIE
+
+from .. import cache as page_cache
+from ..cache import get_version
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse('posts:profile', kwargs={'username': 'auth'})
+        cache.clear()
+
+    def test_post_card_is_served_from_cache(self):
+        self.guest_client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(text='Не из кэша')
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Тестовый пост')
+
+    def test_post_edit_invalidates_card(self):
+        self.guest_client.get(self.url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Изменённый текст'
+        post.save()
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Изменённый текст')
+
+    def test_group_change_invalidates_card(self):
+        self.guest_client.get(self.url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new-slug'
+        group.save()
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, '/group/new-slug/')
+
+    def test_author_rename_invalidates_card(self):
+        self.guest_client.get(self.url)
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Алексей'
+        author.save()
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Автор: Алексей Толстой')
+
+    def test_username_change_invalidates_old_profile(self):
+        self.guest_client.get(self.url)
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'leo'
+        author.save()
+        self.assertEqual(self.guest_client.get(self.url).status_code, 404)
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other-slug',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.group_url = reverse('posts:group_list', args=['test-slug'])
+        self.profile_url = reverse('posts:profile', args=['auth'])
+        cache.clear()
+
+    def test_group_and_profile_are_served_from_cache(self):
+        self.guest_client.get(self.group_url)
+        self.guest_client.get(self.profile_url)
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Мимо сигналов', group=self.group)
+        ])
+        self.assertNotContains(
+            self.guest_client.get(self.group_url), 'Мимо сигналов'
+        )
+        self.assertNotContains(
+            self.guest_client.get(self.profile_url), 'Мимо сигналов'
+        )
+
+    def test_new_post_invalidates_its_pages_only(self):
+        other_url = reverse('posts:group_list', args=['other-slug'])
+        self.guest_client.get(self.group_url)
+        self.guest_client.get(self.profile_url)
+        self.guest_client.get(other_url)
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Мимо сигналов', group=self.group)
+        ])
+        Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group
+        )
+        self.assertContains(
+            self.guest_client.get(self.group_url), 'Новый пост'
+        )
+        self.assertContains(
+            self.guest_client.get(self.profile_url), 'Новый пост'
+        )
+        self.assertNotContains(
+            self.guest_client.get(other_url), 'Мимо сигналов'
+        )
+
+    def test_moved_post_leaves_old_group_page(self):
+        self.guest_client.get(self.group_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertNotContains(
+            self.guest_client.get(self.group_url), 'Тестовый пост'
+        )
+
+    def test_follow_invalidates_profile(self):
+        self.guest_client.get(self.profile_url)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        reader_client.get(reverse('posts:profile_follow', args=['auth']))
+        self.assertContains(
+            self.guest_client.get(self.profile_url), 'Подписчиков: 1'
+        )
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.post_url = reverse('posts:post_detail', args=[self.post.pk])
+        self.profile_url = reverse('posts:profile', args=['auth'])
+        cache.clear()
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in (
+            self.post_url, self.profile_url,
+            reverse('posts:group_list', args=['test-slug']),
+        ):
+            with self.subTest(url=url):
+                response = self.revalidate(self.guest_client, url)
+                self.assertEqual(response.status_code, 304)
+                self.assertTrue(response.has_header('ETag'))
+
+    def test_post_page_not_modified_without_loading_comments(self):
+        etag = self.guest_client.get(self.post_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                self.post_url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_comment_changes_post_page(self):
+        etag = self.guest_client.get(self.post_url)['ETag']
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'}
+        )
+        response = self.guest_client.get(
+            self.post_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertContains(response, 'Комментарий')
+
+    def test_validator_depends_on_user(self):
+        author_client = Client()
+        author_client.force_login(self.author)
+        etag = author_client.get(self.post_url)['ETag']
+        response = self.reader_client.get(
+            self.post_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_profile(self):
+        etag = self.reader_client.get(self.profile_url)['ETag']
+        self.reader_client.get(reverse('posts:profile_follow', args=['auth']))
+        response = self.reader_client.get(
+            self.profile_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertContains(response, 'Отписаться')
+
+
+class BumpOnCommitTests(TestCase):
+    def test_index_version_changes_again_after_commit(self):
+        author = User.objects.create_user(username='auth')
+        with mock.patch.object(page_cache, 'transaction') as transaction:
+            Post.objects.create(author=author, text='Новый пост')
+        # Страница, собранная до коммита по старым строкам, осталась
+        # бы под этой версией.
+        before_commit = get_version('index')
+        for call in transaction.on_commit.call_args_list:
+            call[0][0]()
+        self.assertNotEqual(get_version('index'), before_commit)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaReadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=['test-slug']),
+            reverse('posts:profile', args=['auth']),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+
+    def replica_reads(self, url):
+        """Число чтений с реплики за запрос url."""
+        # Реплики 'replica' в DATABASES нет: роутер направляется на
+        # основную базу, а выборы реплики считаются.
+        with mock.patch.object(routers, 'random') as random:
+            random.choice.return_value = 'default'
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return random.choice.call_count
+
+    def test_pages_with_settled_versions_read_replica(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertGreater(self.replica_reads(url), 0)
+
+    def test_recently_changed_pages_read_primary(self):
+        cache.clear()
+        Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group
+        )
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.replica_reads(url), 0)
+
+    def test_sticky_client_reads_primary(self):
+        self.client.cookies[STICKY_COOKIE] = '1'
+        for url in self.urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertEqual(self.replica_reads(url), 0)
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..views import COMMENTS_COUNT
+
+User = get_user_model()
+
+
+class CommentPagingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.author, text=f'Коммент {index}')
+            for index in range(COMMENTS_COUNT + 5)
+        ])
+        Post.objects.filter(pk=cls.post.pk).update(
+            comments_count=COMMENTS_COUNT + 5
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def test_first_page_and_load_more(self):
+        response = self.guest_client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_COUNT)
+        self.assertContains(response, 'Показать ещё')
+        response = self.guest_client.get(
+            reverse('posts:comments', args=[self.post.pk]),
+            {'cursor': comments.next_cursor}
+        )
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertEqual(response['X-Next-Cursor'], '')
+        self.assertContains(response, 'Коммент 0')
+
+    def test_cursor_in_page_url_shows_next_comments(self):
+        first = self.guest_client.get(self.url).context['comments']
+        response = self.guest_client.get(
+            self.url, {'comments': first.next_cursor}
+        )
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertNotContains(response, 'Показать ещё')
+
+    @override_settings(POST_COMMENTS_STREAM_FROM=COMMENTS_COUNT)
+    def test_long_thread_is_streamed(self):
+        response = self.guest_client.get(self.url)
+        self.assertTrue(response.streaming)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertIn('Тестовый пост', chunks[0])
+        self.assertNotIn('Коммент ', chunks[0])
+        self.assertEqual(len(chunks), 4)
+        page = ''.join(chunks)
+        self.assertEqual(page.count('Коммент '), COMMENTS_COUNT + 5)
+        self.assertTrue(page.rstrip().endswith('</html>'))
+        self.assertNotIn('Показать ещё', page)
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feed
+from ..models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Старый пост')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'auth'})
+        )
+
+    def test_follow_backfills_feed(self):
+        self.follow()
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=self.post).exists()
+        )
+
+    def test_new_post_is_pushed_to_followers(self):
+        self.follow()
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_unfollow_prunes_feed(self):
+        self.follow()
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'auth'})
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_celebrity_posts_are_merged_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(
+            list(feed.feed_for(self.reader)), [post, self.post]
+        )
+
+    def test_crossing_fanout_limit_keeps_posts(self):
+        self.follow()
+        fan = User.objects.create_user(username='fan')
+        with override_settings(FEED_FANOUT_LIMIT=2):
+            Follow.objects.create(user=fan, author=self.author)
+            post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(
+            list(feed.FeedPaginator(self.reader, 10).get_page(None)),
+            [post, self.post]
+        )
+        # Автор снова ниже порога: новые посты раскладываются, а
+        # прежние по-прежнему подмешиваются при чтении.
+        newer = Post.objects.create(author=self.author, text='Ещё пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=newer).exists()
+        )
+        self.assertEqual(
+            list(feed.FeedPaginator(self.reader, 10).get_page(None)),
+            [newer, post, self.post]
+        )
+
+    def test_paginator_merges_both_sources(self):
+        self.follow()
+        posts = [self.post]
+        for number in range(3):
+            with override_settings(FEED_FANOUT_LIMIT=1 + number % 2):
+                posts.append(Post.objects.create(
+                    author=self.author, text=f'Пост {number}'
+                ))
+        self.assertEqual(
+            [post.fanned_out for post in posts], [True, False, True, False]
+        )
+        posts.reverse()
+        first = feed.FeedPaginator(self.reader, 2).get_page(None)
+        self.assertEqual(list(first), posts[:2])
+        second = feed.FeedPaginator(self.reader, 2).get_page(
+            first.next_cursor
+        )
+        self.assertEqual(list(second), posts[2:])
+        self.assertFalse(second.has_next())
+        back = feed.FeedPaginator(self.reader, 2).get_page(
+            second.previous_cursor
+        )
+        self.assertEqual(list(back), posts[:2])
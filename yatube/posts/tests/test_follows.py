@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import cache as page_cache
+from .. import follows
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{index}')
+            for index in range(3)
+        ]
+        for author in reversed(cls.authors[:2]):
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_followees_are_sorted_and_cached(self):
+        expected = sorted(author.pk for author in self.authors[:2])
+        self.assertEqual(list(follows.followee_ids(self.reader.pk)), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                list(follows.followee_ids(self.reader.pk)), expected
+            )
+
+    def test_batched_check_needs_no_queries(self):
+        follows.followee_ids(self.reader.pk)
+        with self.assertNumQueries(0):
+            followed = follows.followed_among(
+                self.reader, [author.pk for author in self.authors]
+            )
+        self.assertEqual(followed, {author.pk for author in self.authors[:2]})
+
+    def test_follow_and_unfollow_reset_cached_graph(self):
+        follows.followee_ids(self.reader.pk)
+        new_author, old_author = self.authors[2], self.authors[0]
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[new_author.username])
+        )
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[old_author.username])
+        )
+        with self.assertNumQueries(1):
+            self.assertTrue(follows.is_following(self.reader, new_author.pk))
+            self.assertFalse(follows.is_following(self.reader, old_author.pk))
+
+    def test_graph_built_before_commit_is_dropped(self):
+        stale = follows.followee_ids(self.reader.pk)
+        with mock.patch.object(page_cache, 'transaction') as transaction:
+            Follow.objects.create(user=self.reader, author=self.authors[2])
+            # Параллельный запрос собрал массив по базе до коммита.
+            cache.set(follows._key(self.reader.pk), stale.tobytes())
+        self.assertFalse(follows.is_following(self.reader, self.authors[2].pk))
+        for call in transaction.on_commit.call_args_list:
+            call[0][0]()
+        self.assertTrue(follows.is_following(self.reader, self.authors[2].pk))
+
+    def test_index_shows_follow_state_per_post(self):
+        Post.objects.create(author=self.authors[2], text='Пост')
+        url = reverse('posts:index')
+        self.assertContains(self.reader_client.get(url), 'Подписаться')
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.authors[2].username])
+        )
+        response = self.reader_client.get(url)
+        self.assertContains(response, 'Вы подписаны на автора')
+        self.assertNotContains(response, 'Подписаться на автора')
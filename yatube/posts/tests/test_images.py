@@ -0,0 +1,53 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from ..forms import PostForm
+
+EXIF_ORIENTATION_ROTATED: int = 6
+
+
+def upload(name, size, mode='RGB', image_format='JPEG', **options):
+    content = BytesIO()
+    Image.new(mode, size, 'red').save(content, image_format, **options)
+    return SimpleUploadedFile(name, content.getvalue())
+
+
+@override_settings(POST_IMAGE_MAX_SIDE=100, POST_IMAGE_KEEP_BYTES=100_000)
+class ImageUploadTests(SimpleTestCase):
+    def clean(self, image):
+        form = PostForm(data={'text': 'Текст'}, files={'image': image})
+        form.is_valid()
+        return form
+
+    def test_large_photo_is_downscaled_and_stripped(self):
+        exif = Image.Exif()
+        exif[0x0112] = EXIF_ORIENTATION_ROTATED
+        form = self.clean(
+            upload('photo.jpeg', (400, 200), exif=exif.tobytes())
+        )
+        stored = form.cleaned_data['image']
+        self.assertEqual(stored.name, 'photo.jpg')
+        image = Image.open(stored)
+        self.assertEqual(image.size, (50, 100))
+        self.assertNotIn('exif', image.info)
+
+    def test_transparency_survives(self):
+        form = self.clean(
+            upload('logo.png', (300, 300), 'RGBA', 'PNG')
+        )
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.size, (100, 100))
+        self.assertEqual(image.mode, 'RGBA')
+
+    def test_small_clean_image_is_kept(self):
+        original = upload('small.png', (20, 20), image_format='PNG')
+        form = self.clean(original)
+        self.assertIs(form.cleaned_data['image'], original)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=10_000)
+    def test_decompression_bomb_is_rejected(self):
+        form = self.clean(upload('bomb.png', (200, 200), image_format='PNG'))
+        self.assertIn('image', form.errors)
@@ -0,0 +1,93 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+POSTS_TABLES = (
+    'posts_post', 'posts_comment', 'posts_follow', 'posts_feedentry'
+)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for post_index in range(25):
+            post = Post.objects.create(
+                author=cls.author,
+                text=f'Тестовый пост {post_index}',
+                group=cls.group,
+            )
+        Comment.objects.create(post=post, author=cls.user, text='Коммент')
+        cls.post = post
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def plans(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or not any(
+                    table in sql for table in POSTS_TABLES
+                ):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        return response, plans
+
+    def assert_indexed(self, url, params=None):
+        response, plans = self.plans(url, params)
+        for sql, steps in plans:
+            for step in steps:
+                if step.startswith('SCAN'):
+                    self.assertIn('INDEX', step, sql)
+                self.assertNotIn('TEMP B-TREE', step, sql)
+        return response
+
+    def test_listing_views_walk_indexes_in_order(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.assert_indexed(url)
+                next_cursor = response.context['page_obj'].next_cursor
+                self.assert_indexed(url, {'cursor': next_cursor})
+
+    def test_post_detail_uses_indexes(self):
+        self.assert_indexed(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+
+    def test_follow_index_reads_only_one_window(self):
+        response = self.assert_indexed(reverse('posts:follow_index'))
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assert_indexed(
+            reverse('posts:follow_index'), {'cursor': next_cursor}
+        )
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
@@ -30,6 +31,7 @@ class PaginatorViewsTest(TestCase):
 
     def setUp(self):
         self.guest_client = Client()
+        cache.clear()
 
     def test_first_page_contains_ten_records(self):
         response = self.guest_client.get(reverse('posts:index'))
@@ -46,3 +48,36 @@ class PaginatorViewsTest(TestCase):
             reverse('posts:profile', kwargs={'username': 'auth'})
         )
         self.assertEqual(len(response.context['page_obj']), NUM_OF_POSTS)
+
+    def test_cursor_pages_cover_all_posts_once(self):
+        first = self.guest_client.get(reverse('posts:index'))
+        first_page = first.context['page_obj']
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        second = self.guest_client.get(
+            reverse('posts:index'), {'cursor': first_page.next_cursor}
+        )
+        second_page = second.context['page_obj']
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(
+            len(set(first_page) | set(second_page)), len(self.posts)
+        )
+        back = self.guest_client.get(
+            reverse('posts:index'), {'cursor': second_page.previous_cursor}
+        )
+        self.assertEqual(list(back.context['page_obj']), list(first_page))
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'не курсор'}
+        )
+        self.assertFalse(response.context['page_obj'].has_previous())
+        self.assertEqual(len(response.context['page_obj']), NUM_OF_POSTS)
+
+    def test_numbered_page_links_still_work(self):
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            {'page': 2}
+        )
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(len(response.context['page_obj']), NUM_OF_POSTS)
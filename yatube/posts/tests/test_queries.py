@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Бюджет запросов при холодном кэше. Для вошедшего пользователя к нему
+# добавляются запросы сессии и пользователя.
+GUEST_QUERIES = {
+    'posts:index': 1,
+    'posts:group_list': 2,
+    'posts:profile': 2,
+    'posts:post_detail': 2,
+}
+AUTH_QUERIES: int = 2
+
+
+class QueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.user = User.objects.create_user(username='HasNoName')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for post_index in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Тестовый пост {post_index}',
+                group=cls.group,
+            )
+        for comment_index in range(5):
+            commenter = User.objects.create_user(
+                username=f'commenter{comment_index}'
+            )
+            Comment.objects.create(
+                post=cls.post, author=commenter, text='Комментарий'
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.kwargs = {
+            'posts:index': {},
+            'posts:group_list': {'slug': 'test-slug'},
+            'posts:profile': {'username': 'auth'},
+            'posts:post_detail': {'post_id': self.post.pk},
+        }
+
+    def assert_max_queries(self, client, url, limit):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), limit,
+            '\n'.join(query['sql'] for query in queries)
+        )
+
+    def test_guest_pages_fit_query_budget(self):
+        for name, limit in GUEST_QUERIES.items():
+            with self.subTest(name=name):
+                url = reverse(name, kwargs=self.kwargs[name])
+                self.assert_max_queries(self.guest_client, url, limit)
+
+    def test_authorized_pages_fit_query_budget(self):
+        # Окно ленты — записи FeedEntry и непосредственно посты
+        # популярных авторов, по запросу на каждый источник.
+        budget = dict(GUEST_QUERIES, **{'posts:follow_index': 2})
+        # При холодном кэше массив подписок (posts.follows) собирается
+        # одним запросом.
+        for name in ('posts:index', 'posts:group_list', 'posts:profile'):
+            budget[name] += 1
+        # Рекомендации (posts.recommendations) читаются одним запросом.
+        for name in ('posts:profile', 'posts:follow_index'):
+            budget[name] += 1
+        self.kwargs['posts:follow_index'] = {}
+        for name, limit in budget.items():
+            with self.subTest(name=name):
+                url = reverse(name, kwargs=self.kwargs[name])
+                self.assert_max_queries(
+                    self.authorized_client, url, limit + AUTH_QUERIES
+                )
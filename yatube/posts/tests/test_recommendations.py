@@ -0,0 +1,99 @@
+import importlib.util
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import follows, recommendations
+from ..models import Follow, Recommendation
+
+User = get_user_model()
+
+HAS_NUMERIC = all(
+    importlib.util.find_spec(name) for name in ('numpy', 'scipy')
+)
+
+
+@skipUnless(HAS_NUMERIC, 'Для рекомендаций нужны numpy и scipy')
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'twin', 'fan', 'tolstoy', 'chekhov',
+                         'gogol', 'pushkin')
+        }
+        for user, authors in (
+            ('reader', ['tolstoy']),
+            ('twin', ['tolstoy', 'chekhov', 'gogol']),
+            ('fan', ['tolstoy', 'chekhov']),
+            ('pushkin', ['gogol']),
+        ):
+            for author in authors:
+                Follow.objects.create(
+                    user=cls.users[user], author=cls.users[author]
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def build(self, chunk_size=2):
+        call_command(
+            'build_recommendations', chunk_size=chunk_size, stdout=StringIO()
+        )
+
+    def ranked(self, name):
+        return list(
+            Recommendation.objects.filter(user=self.users[name])
+            .values_list('author__username', flat=True)
+        )
+
+    def test_co_followed_authors_are_ranked(self):
+        self.build()
+        self.assertEqual(self.ranked('reader'), ['chekhov', 'gogol'])
+        self.assertEqual(self.ranked('fan'), ['gogol'])
+
+    def test_chunk_size_does_not_change_result(self):
+        self.build(chunk_size=1000)
+        expected = list(Recommendation.objects.values_list(
+            'user_id', 'author_id', 'rank'
+        ))
+        self.build(chunk_size=1)
+        self.assertEqual(
+            list(Recommendation.objects.values_list(
+                'user_id', 'author_id', 'rank'
+            )),
+            expected
+        )
+
+    def test_rebuild_drops_users_without_follows(self):
+        self.build()
+        Follow.objects.filter(user=self.users['reader']).delete()
+        self.build()
+        self.assertEqual(self.ranked('reader'), [])
+
+    def test_pages_show_unfollowed_recommendations(self):
+        self.build()
+        client = Client()
+        client.force_login(self.users['reader'])
+        for name in ('posts:follow_index', 'posts:profile'):
+            with self.subTest(name=name):
+                url = reverse(name, kwargs=(
+                    {'username': 'tolstoy'} if name == 'posts:profile'
+                    else {}
+                ))
+                self.assertEqual(
+                    [author.username
+                     for author in client.get(url).context['recommended']],
+                    ['chekhov', 'gogol']
+                )
+        client.get(reverse('posts:profile_follow', args=['chekhov']))
+        follows.followee_ids(self.users['reader'].pk)
+        with self.assertNumQueries(1):
+            shown = recommendations.for_user(self.users['reader'])
+        self.assertEqual([author.username for author in shown], ['gogol'])
@@ -0,0 +1,72 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'индекс FTS5 есть только в SQLite')
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.rare = Post.objects.create(
+            author=cls.author, text='Кошка спит на окне'
+        )
+        cls.often = Post.objects.create(
+            author=cls.author, text='Кошка, кошка и ещё раз кошка'
+        )
+        Post.objects.create(author=cls.author, text='Собака гуляет')
+
+    def setUp(self):
+        self.backend = search.get_backend()
+        self.guest_client = Client()
+
+    def results(self, query):
+        return list(self.backend.search(query)[:10])
+
+    def test_backend_is_fts_on_sqlite(self):
+        self.assertIsInstance(self.backend, search.SQLiteFTSSearchBackend)
+
+    def test_results_are_ranked(self):
+        self.assertEqual(self.results('кошка'), [self.often, self.rare])
+
+    def test_index_follows_edit_and_delete(self):
+        post = Post.objects.get(pk=self.rare.pk)
+        post.text = 'Попугай спит'
+        post.save()
+        self.assertEqual(self.results('попугай'), [post])
+        self.assertEqual(self.results('кошка'), [self.often])
+        post.delete()
+        self.assertEqual(self.results('попугай'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.results('"кошка* ('), [self.often, self.rare])
+        self.assertEqual(self.results('!!!'), [])
+
+    def test_rebuild_restores_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.results('собака')[0].text, 'Собака гуляет')
+
+    def test_search_view_paginates_and_keeps_query(self):
+        for post_index in range(12):
+            Post.objects.create(author=self.author, text=f'Кошка {post_index}')
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'кошка'}
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(
+            response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&amp;page=2'
+        )
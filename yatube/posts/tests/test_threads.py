@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import threads
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(
+            post=self.post, author=self.author, text=text, parent=parent
+        )
+
+    def reply(self, parent, text):
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': text, 'parent': parent.pk}
+        )
+        return Comment.objects.get(text=text)
+
+    def test_reply_gets_path_depth_and_counts(self):
+        root = self.comment('Корень')
+        reply = self.reply(root, 'Ответ')
+        answer = self.reply(reply, 'Ответ на ответ')
+        self.assertEqual(reply.parent, root)
+        self.assertEqual(reply.depth, 1)
+        self.assertEqual(answer.path, root.path + threads.segment(reply.pk)
+                         + threads.segment(answer.pk))
+        root.refresh_from_db()
+        self.assertEqual(root.replies_count, 2)
+        reply.delete()
+        root.refresh_from_db()
+        self.assertEqual(root.replies_count, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_thread_does_not_grow_deeper_than_limit(self):
+        parent = self.comment('Корень')
+        for level in range(threads.MAX_DEPTH + 1):
+            parent = self.reply(parent, f'Уровень {level}')
+        self.assertEqual(parent.depth, threads.MAX_DEPTH)
+        self.assertEqual(
+            Comment.objects.filter(depth=threads.MAX_DEPTH).count(), 2
+        )
+
+    def test_reply_to_other_post_is_rejected(self):
+        other = Post.objects.create(author=self.author, text='Другой пост')
+        foreign = Comment.objects.create(
+            post=other, author=self.author, text='Чужой'
+        )
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Ответ', 'parent': foreign.pk}
+        )
+        self.assertFalse(Comment.objects.filter(text='Ответ').exists())
+
+    def test_subtree_is_one_ordered_query(self):
+        root = self.comment('Корень')
+        first = self.comment('Первый', root)
+        self.comment('Второй', root)
+        self.comment('Под первым', first)
+        with CaptureQueriesContext(connection) as queries:
+            texts = [reply.text for reply in threads.subtree(root)]
+        self.assertEqual(texts, ['Первый', 'Под первым', 'Второй'])
+        self.assertEqual(len(queries), 1)
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertIn('comment_post_path_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_post_page_shows_first_replies_and_pages_the_rest(self):
+        root = self.comment('Корень')
+        replies = [
+            self.comment(f'Ответ {index}', root)
+            for index in range(threads.REPLIES_COUNT + 2)
+        ]
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        shown = response.context['comments'][0]
+        self.assertEqual(shown.thread, replies[:threads.REPLIES_COUNT])
+        self.assertTrue(shown.more_replies)
+        self.assertContains(response, 'Показать ответы')
+        response = self.authorized_client.get(
+            reverse('posts:comment_replies', args=[self.post.pk, root.pk]),
+            {'after': shown.thread[-1].path}
+        )
+        self.assertEqual(
+            list(response.context['comments']),
+            replies[threads.REPLIES_COUNT:]
+        )
+        self.assertEqual(response['X-Next-Cursor'], '')
+
+    def test_reconcile_fills_paths_and_reply_counts(self):
+        root = self.comment('Корень')
+        self.comment('Ответ', root)
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.author, text='Без пути')
+        ])
+        Comment.objects.filter(pk=root.pk).update(replies_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        loaded = Comment.objects.get(text='Без пути')
+        self.assertEqual(loaded.path, threads.segment(loaded.pk))
+        root.refresh_from_db()
+        self.assertEqual(root.replies_count, 1)
@@ -0,0 +1,98 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='photo.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 20), 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=2)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.post = Post.objects.create(
+            author=self.author, text='Тестовый пост', image=make_image()
+        )
+
+    def lookup(self):
+        geometry, options = settings.POST_THUMBNAILS[0]
+        return default.backend.get_thumbnail(
+            self.post.image, geometry, **options
+        )
+
+    def test_missing_thumbnail_is_queued_and_source_served(self):
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda func: func()
+        ), mock.patch.object(thumbnails, 'submit') as submit:
+            image = self.lookup()
+        submit.assert_called_once_with(
+            self.post.image.name, stale=thumbnails.stale_pages(self.post)
+        )
+        self.assertEqual(image.name, self.post.image.name)
+
+    def test_generated_thumbnail_is_read_from_kvstore(self):
+        thumbnails.generate(self.post.image.name)
+        with mock.patch.object(thumbnails, 'submit') as submit:
+            image = self.lookup()
+        submit.assert_not_called()
+        self.assertTrue(image.name.startswith('cache/'))
+        self.assertEqual(image.width, 960)
+
+    def test_post_create_schedules_thumbnails(self):
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda func: func()
+        ), mock.patch.object(thumbnails, 'submit') as submit:
+            self.author_client.post(
+                reverse('posts:post_create'),
+                {'text': 'С картинкой', 'image': make_image('new.png')}
+            )
+        post = Post.objects.get(text='С картинкой')
+        submit.assert_called_once_with(post.image.name, responsive=False)
+
+    def test_refresh_drops_pages_served_with_source(self):
+        cache.clear()
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda func: func()
+        ), mock.patch.object(thumbnails, '_get_executor') as executor:
+            self.author_client.get(reverse('posts:index'))
+            self.assertTrue(executor.called)
+            executor.reset_mock()
+            thumbnails._pending.clear()
+            thumbnails.refresh(self.post.image.name)
+            # Страница и карточка собираются заново, а не из кэша с
+            # исходной картинкой.
+            self.author_client.get(reverse('posts:index'))
+            self.assertTrue(executor.called)
+        thumbnails._pending.clear()
+        thumbnails.refresh(self.post.image.name)
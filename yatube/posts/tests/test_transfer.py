@@ -0,0 +1,159 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import follows, transfer
+from ..cache import (
+    author_version, follows_version, get_version, group_version
+)
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Пост, с запятой и "кавычками"\nв две строки',
+            image=SimpleUploadedFile('small.gif', b'GIF89a', 'image/gif'),
+        )
+        Post.objects.create(author=cls.reader, text='Пост без группы')
+        comment = Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Ответ', parent=comment
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def snapshot(self):
+        return {
+            'groups': list(Group.objects.values_list('slug', 'title')),
+            'posts': sorted(Post.objects.values_list(
+                'author__username', 'created', 'group__slug', 'text', 'image'
+            )),
+            'comments': list(Comment.objects.values_list(
+                'post__text', 'author__username', 'created', 'text',
+                'parent__text', 'depth', 'replies_count'
+            )),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        }
+
+    def export(self, *args):
+        call_command(
+            'export_posts', self.directory, *args, stdout=StringIO()
+        )
+
+    def load(self, *args):
+        call_command(
+            'import_posts', self.directory, *args, stdout=StringIO()
+        )
+
+    def wipe(self):
+        Group.objects.all().delete()
+        Post.objects.all().delete()
+
+    def test_round_trip(self):
+        for file_format in transfer.FORMATS:
+            with self.subTest(file_format=file_format):
+                expected = self.snapshot()
+                self.export('--format', file_format, '--with-media')
+                self.wipe()
+                default_storage.delete(self.post.image.name)
+                self.load('--format', file_format)
+                self.assertEqual(self.snapshot(), expected)
+                self.assertTrue(default_storage.exists(self.post.image.name))
+                self.assertEqual(
+                    User.objects.get(username='auth').stats.followers_count, 1
+                )
+
+    def test_replies_keep_parent_across_batches(self):
+        expected = self.snapshot()
+        self.export()
+        self.wipe()
+        self.load('--batch-size', '1')
+        self.assertEqual(self.snapshot(), expected)
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(
+            reply.path, reply.parent.path + str(reply.pk).zfill(10)
+        )
+
+    def test_second_import_adds_nothing(self):
+        self.export()
+        expected = self.snapshot()
+        self.load()
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_unknown_users_are_skipped_or_created(self):
+        self.export()
+        self.wipe()
+        User.objects.filter(username='reader').delete()
+        self.load()
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+        self.load('--create-users')
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertFalse(
+            User.objects.get(username='reader').has_usable_password()
+        )
+
+    def test_import_resets_cached_pages_and_follows(self):
+        self.export()
+        self.wipe()
+        Follow.objects.all().delete()
+        self.assertFalse(follows.is_following(self.reader, self.author.pk))
+        names = [
+            author_version('auth'), author_version('reader'),
+            group_version('test-slug'), follows_version(self.reader.pk),
+        ]
+        before = [get_version(name) for name in names]
+        self.load()
+        self.assertTrue(follows.is_following(self.reader, self.author.pk))
+        for name, version in zip(names, before):
+            with self.subTest(name=name):
+                self.assertNotEqual(get_version(name), version)
+
+    def test_resume_skips_loaded_rows(self):
+        self.export()
+        self.wipe()
+        path = os.path.join(self.directory, 'posts.jsonl')
+        transfer.write_checkpoint(path, 1)
+        self.load('--resume')
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['Пост без группы']
+        )
+        self.assertFalse(os.path.exists(transfer.checkpoint_path(path)))
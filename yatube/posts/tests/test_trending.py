@@ -0,0 +1,73 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.old = Post.objects.create(author=cls.author, text='Старый пост')
+        cls.new = Post.objects.create(author=cls.author, text='Новый пост')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def ranked(self):
+        response = self.authorized_client.get(reverse('posts:trending'))
+        return [post.text for post in response.context['posts']]
+
+    def test_comments_raise_post(self):
+        self.assertEqual(self.ranked(), ['Новый пост', 'Старый пост'])
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.old.pk]),
+            {'text': 'Комментарий'}
+        )
+        self.assertEqual(self.ranked(), ['Старый пост', 'Новый пост'])
+
+    def test_old_activity_decays(self):
+        now = timezone.now()
+        long_ago = now - timedelta(seconds=10 * settings.TRENDING_HALF_LIFE)
+        for _ in range(100):
+            trending.record(self.old.pk, long_ago)
+        trending.record(self.new.pk, now)
+        self.assertEqual(self.ranked(), ['Новый пост', 'Старый пост'])
+
+    def test_incremental_score_matches_recompute(self):
+        for text in ('Первый', 'Второй'):
+            Comment.objects.create(
+                post=self.old, author=self.author, text=text
+            )
+        incremental = Post.objects.get(pk=self.old.pk).trending
+        Post.objects.update(trending=0)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertAlmostEqual(
+            Post.objects.get(pk=self.old.pk).trending, incremental, places=6
+        )
+
+    def test_page_is_one_indexed_query(self):
+        guest_client = Client()
+        with CaptureQueriesContext(connection) as queries:
+            guest_client.get(reverse('posts:trending'))
+        self.assertEqual(len(queries), 1)
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + queries[0]['sql'])
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertIn('post_trending_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
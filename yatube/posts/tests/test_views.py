@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
@@ -211,13 +212,22 @@ class TaskPagesTests(TestCase):
 
     def test_cache_index(self):
         first_response = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.filter(pk=1).delete()
         second_response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIsNone(second_response.context)
         self.assertEqual(first_response.content, second_response.content)
-        cache.clear()
+        Post.objects.filter(pk=1).delete()
         third_response = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(second_response.content, third_response.content)
 
+    def test_cache_index_serves_stale_copy_while_rebuilding(self):
+        first_response = self.guest_client.get(reverse('posts:index'))
+        Post.objects.create(author=self.author, text='Новый пост')
+        with mock.patch.object(cache, 'add', return_value=False):
+            second_response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(first_response.content, second_response.content)
+        third_response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(third_response, 'Новый пост')
+
     def test_follow_index(self):
         self.follow_client = User.objects.create_user(username='Varya')
         self.not_follow_client = Client()
@@ -0,0 +1,139 @@
+"""Ветки комментариев: materialized path.
+
+path комментария — id всех его предков и его собственный id, каждый
+дополнен нулями до SEGMENT знаков. Поддерево любого комментария — это
+диапазон [path, path + END) в индексе (post, path), поэтому ветка целиком
+или её очередная страница выбирается одним запросом уже в нужном порядке.
+Корневые комментарии (depth = 0) листаются курсором по (created, id), а
+ответы к странице корней подгружаются одним запросом, не больше
+REPLIES_COUNT на ветку. replies_count — число всех ответов в поддереве.
+"""
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+from . import counters
+from .models import Comment
+
+SEGMENT: int = 10
+MAX_DEPTH: int = 4
+REPLIES_COUNT: int = 5
+REPLIES_PAGE: int = 50
+# Символ больше любой цифры: path + END ограничивает поддерево сверху.
+END: str = '~'
+
+
+def segment(pk):
+    return str(pk).zfill(SEGMENT)
+
+
+def ancestor_ids(path):
+    return [
+        int(path[start:start + SEGMENT])
+        for start in range(0, len(path) - SEGMENT, SEGMENT)
+    ]
+
+
+def root_path(path):
+    return path[:SEGMENT]
+
+
+def reply_parent(parent):
+    """Комментарий, к которому на деле прикрепляется ответ на parent.
+
+    Глубже MAX_DEPTH ветка не растёт: ответ на самый глубокий
+    комментарий становится его соседом.
+    """
+    if parent.depth < MAX_DEPTH:
+        return parent
+    return Comment.objects.get(pk=ancestor_ids(parent.path)[MAX_DEPTH - 1])
+
+
+def attach(comment):
+    """Записывает path и depth нового комментария и считает его ответом."""
+    parent = comment.parent
+    comment.path = (parent.path if parent else '') + segment(comment.pk)
+    comment.depth = parent.depth + 1 if parent else 0
+    Comment.objects.filter(pk=comment.pk).update(
+        path=comment.path, depth=comment.depth
+    )
+    if parent:
+        counters.change_replies(ancestor_ids(comment.path), 1)
+
+
+def fill_paths():
+    """Дописывает path комментариям, созданным через bulk_create.
+
+    Сначала корням веток — их path равен собственному id, затем ответам
+    уровень за уровнем — к path родителя дописывается свой id.
+    """
+    own = LPad(Cast('id', CharField()), SEGMENT, Value('0'))
+    filled = Comment.objects.filter(path='', parent__isnull=True).update(
+        path=own, depth=0
+    )
+    parent = Comment.objects.filter(pk=OuterRef('parent_id'))
+    while True:
+        level = Comment.objects.filter(path='', parent__path__gt='')
+        updated = level.update(
+            path=Concat(
+                Subquery(parent.values('path'), output_field=CharField()),
+                own
+            ),
+            depth=Subquery(parent.values('depth')) + 1,
+        )
+        if not updated:
+            return filled
+        filled += updated
+
+
+def subtree(comment, after=None):
+    """Ответы в поддереве comment по порядку ветки, после path after."""
+    return Comment.objects.filter(
+        post_id=comment.post_id,
+        path__gt=after or comment.path,
+        path__lt=comment.path + END,
+    ).order_by('path')
+
+
+def replies_page(comment, after=None):
+    """Страница поддерева и path, с которого начнётся следующая."""
+    replies = list(
+        subtree(comment, after).select_related('author')[:REPLIES_PAGE + 1]
+    )
+    has_next = len(replies) > REPLIES_PAGE
+    replies = replies[:REPLIES_PAGE]
+    return replies, replies[-1].path if has_next else ''
+
+
+def attach_replies(roots):
+    """Подгружает первые ответы к странице корневых комментариев.
+
+    Каждый корень получает список thread и флаг more_replies. Все ветки
+    выбираются одним запросом по диапазону path: ROW_NUMBER() по ветке
+    отсекает лишние ответы ещё в базе.
+    """
+    roots = list(roots)
+    for root in roots:
+        root.thread = []
+        root.more_replies = False
+    threaded = {root.path: root for root in roots if root.replies_count}
+    if not threaded:
+        return roots
+    table = Comment._meta.db_table
+    replies = Comment.objects.raw(
+        f'SELECT * FROM (SELECT *, ROW_NUMBER() OVER ('
+        f'PARTITION BY substr(path, 1, {SEGMENT}) ORDER BY path'
+        f') AS position FROM {table} '
+        f'WHERE post_id = %s AND path > %s AND path < %s AND depth > 0'
+        f') AS replies WHERE position <= %s ORDER BY path',
+        [
+            roots[0].post_id, min(threaded), max(threaded) + END,
+            REPLIES_COUNT,
+        ]
+    ).prefetch_related('author')
+    for reply in replies:
+        root = threaded.get(root_path(reply.path))
+        if root is not None:
+            root.thread.append(reply)
+    for root in threaded.values():
+        root.more_replies = len(root.thread) < root.replies_count
+    return roots
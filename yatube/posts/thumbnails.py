@@ -0,0 +1,199 @@
+"""Фоновая подготовка миниатюр для картинок постов.
+
+После сохранения поста с картинкой все размеры из POST_THUMBNAILS
+строятся в пуле потоков вне цикла запроса, их адаптивные варианты
+(core.images) — там же, после первого показа. Бэкенд для sorl в шаблонах
+только читает готовые миниатюры из key-value store: если миниатюры ещё
+нет, он ставит её в очередь и пока отдаёт исходную картинку.
+Карточки и страницы с исходной картинкой уже лежат в кэше, поэтому,
+достроив миниатюры, поток увеличивает версию картинки и версии страниц
+постов, где её показали (refresh).
+THUMBNAIL_WORKERS = 0 возвращает ленивую генерацию прямо в запросе.
+
+Key-value store миниатюр и версии лежат в кэше Django, а не в базе:
+фоновые потоки не открывают соединений с БД и не конкурируют с
+запросами за блокировки SQLite.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+from core import images, metrics
+
+from .cache import (
+    author_version, bump_version, group_version, image_version, post_version
+)
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+_pending = set()
+_stale = {}
+_worker = threading.local()
+
+
+def workers():
+    return getattr(settings, 'THUMBNAIL_WORKERS', 0)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers(), thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def generate(name, responsive=True):
+    """Строит все размеры из POST_THUMBNAILS для картинки name.
+
+    Без responsive строятся только сами размеры, а адаптивные варианты
+    ставит в очередь первый показ картинки.
+    """
+    _worker.active = True
+    try:
+        for geometry, options in settings.POST_THUMBNAILS:
+            if not responsive:
+                default.backend.get_thumbnail(name, geometry, **options)
+                continue
+            for _, _, size, variant_options in images.variants(
+                geometry, options
+            ):
+                default.backend.get_thumbnail(name, size, **variant_options)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры для %s', name)
+    finally:
+        _worker.active = False
+        with _lock:
+            _pending.discard(name)
+
+
+def stale_pages(post):
+    """Версии страниц, на которых пост показан с исходной картинкой."""
+    names = ['index', post_version(post.pk), author_version(
+        post.author.username
+    )]
+    if post.group_id:
+        names.append(group_version(post.group.slug))
+    return names
+
+
+def refresh(name):
+    """Сбрасывает кэш карточек и страниц, показавших картинку name."""
+    with _lock:
+        stale = _stale.pop(name, set())
+    for version in {image_version(name), *stale}:
+        bump_version(version)
+
+
+def _run_in_worker(name, responsive):
+    try:
+        generate(name, responsive)
+        refresh(name)
+    finally:
+        connections.close_all()
+
+
+def submit(name, responsive=True, stale=()):
+    """Ставит миниатюры name в очередь.
+
+    stale — версии страниц, которые уже показали исходную картинку;
+    их сбросит refresh, когда миниатюры будут готовы.
+    """
+    if not workers():
+        return generate(name, responsive)
+    with _lock:
+        _stale.setdefault(name, set()).update(stale)
+        if name in _pending:
+            return
+        _pending.add(name)
+    _get_executor().submit(_run_in_worker, name, responsive)
+
+
+def schedule(post):
+    """Ставит миниатюры картинки поста в очередь после коммита.
+
+    Сразу после загрузки строятся только основные размеры: пост
+    показывается уже с ними, а остальные варианты поток достроит к
+    следующему показу.
+    """
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: submit(name, responsive=False))
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with metrics.timer('thumbnail'):
+            return self._get_thumbnail(file_, geometry_string, **options)
+
+    def _get_thumbnail(self, file_, geometry_string, **options):
+        if not workers() or getattr(_worker, 'active', False):
+            return super().get_thumbnail(file_, geometry_string, **options)
+        source = ImageFile(file_)
+        thumbnail = ImageFile(
+            self._get_thumbnail_filename(
+                source, geometry_string, self._options(source, options)
+            ),
+            default.storage
+        )
+        cached = default.kvstore.get(thumbnail)
+        if cached:
+            return cached
+        # Вне транзакции on_commit вызывает функцию сразу; в откатываемой
+        # транзакции (например, в тестах) фоновый поток не запускается
+        # и не пишет в MEDIA_ROOT, который уже удаляют.
+        name = source.name
+        post = getattr(file_, 'instance', None)
+        stale = stale_pages(post) if isinstance(post, Post) else ()
+        transaction.on_commit(lambda: submit(name, stale=stale))
+        return source
+
+    def _options(self, source, options):
+        # Те же умолчания, что в ThumbnailBackend.get_thumbnail, чтобы
+        # имя миниатюры совпало с тем, что построит фоновый поток.
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+
+class CacheKVStore(KVStoreBase):
+    """Key-value store sorl в кэше Django без копии в базе.
+
+    Кэш не умеет перечислять ключи, поэтому команды sorl cleanup и
+    clear ничего не находят; потерянная запись просто пересоздаётся
+    при следующей подготовке миниатюры.
+    """
+
+    def _get_raw(self, key):
+        return cache.get(key)
+
+    def _set_raw(self, key, value):
+        cache.set(key, value, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+
+    def _delete_raw(self, *keys):
+        cache.delete_many(keys)
+
+    def _find_keys_raw(self, prefix):
+        return []
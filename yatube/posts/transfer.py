@@ -0,0 +1,390 @@
+"""Перенос данных между окружениями.
+
+Группы, посты, комментарии и подписки выгружаются построчно в JSON Lines
+или CSV. Внешние ключи записываются естественными ключами: пользователь —
+username, группа — slug, пост и комментарий — username автора и время
+создания (родитель ответа — в том же посте). Чтение
+и запись идут пачками, поэтому память не растёт с объёмом данных.
+Строки, которые уже есть в базе, при загрузке пропускаются, так что
+повторный запуск безопасен. bulk_create не отправляет сигналы, поэтому
+версии кэша, которые в обычной работе увеличивает posts.signals, каждая
+выгрузка называет сама (Transfer.versions).
+"""
+import csv
+import json
+import os
+import shutil
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils.dateparse import parse_datetime
+
+from . import follows
+from .cache import (
+    author_version, follows_version, group_version, post_version
+)
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+FORMATS = ('jsonl', 'csv')
+BATCH_SIZE: int = 1000
+
+
+def dump_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class Transfer:
+    """Описание выгрузки одной модели: колонка файла -> поле ORM."""
+
+    model = None
+    name = None
+    fields = {}
+
+    def __init__(self, create_users=False):
+        self.create_users = create_users
+
+    def export_rows(self, after=0, batch_size=BATCH_SIZE):
+        """Отдаёт пары (pk, строка) по возрастанию pk после after."""
+        queryset = self.model.objects.order_by('pk').values_list(
+            'pk', *self.fields.values()
+        )
+        while True:
+            chunk = list(queryset.filter(pk__gt=after)[:batch_size])
+            if not chunk:
+                return
+            for pk, *values in chunk:
+                yield pk, dict(zip(self.fields, map(dump_value, values)))
+            after = chunk[-1][0]
+
+    def build(self, rows):
+        """Возвращает объекты для bulk_create; уже известные пропускает."""
+        raise NotImplementedError
+
+    def link(self, rows):
+        """Проставляет связи, которые ведут на строки той же пачки."""
+
+    def users(self, names):
+        names = {name for name in names if name}
+        if self.create_users:
+            User.objects.bulk_create(
+                [
+                    User(username=name, password=make_password(None))
+                    for name in names
+                ],
+                ignore_conflicts=True
+            )
+        return dict(
+            User.objects.filter(username__in=names)
+            .values_list('username', 'pk')
+        )
+
+    def images(self, rows):
+        return []
+
+    def versions(self, objects):
+        """Имена версий кэша, которые меняют загруженные objects."""
+        return []
+
+
+def _author_versions(user_ids):
+    return [
+        author_version(username) for username in
+        User.objects.filter(pk__in=user_ids).values_list(
+            'username', flat=True
+        )
+    ]
+
+
+class GroupTransfer(Transfer):
+    model = Group
+    name = 'groups'
+    fields = {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    }
+
+    def build(self, rows):
+        existing = set(
+            Group.objects.filter(slug__in=[row['slug'] for row in rows])
+            .values_list('slug', flat=True)
+        )
+        return [
+            Group(**{key: value or '' for key, value in row.items()})
+            for row in rows if row['slug'] not in existing
+        ]
+
+    def versions(self, objects):
+        return [group_version(group.slug) for group in objects]
+
+
+class PostTransfer(Transfer):
+    model = Post
+    name = 'posts'
+    fields = {
+        'author': 'author__username',
+        'created': 'created',
+        'modified': 'modified',
+        'group': 'group__slug',
+        'text': 'text',
+        'image': 'image',
+    }
+
+    def build(self, rows):
+        users = self.users(row['author'] for row in rows)
+        groups = dict(
+            Group.objects.filter(slug__in={row['group'] for row in rows})
+            .values_list('slug', 'pk')
+        )
+        existing = set(
+            Post.objects.filter(
+                author__in=users.values(),
+                created__in=[parse_datetime(row['created']) for row in rows],
+            ).values_list('author_id', 'created')
+        )
+        posts = []
+        for row in rows:
+            author = users.get(row['author'])
+            created = parse_datetime(row['created'])
+            if author is None or (author, created) in existing:
+                continue
+            existing.add((author, created))
+            posts.append(Post(
+                author_id=author,
+                created=created,
+                modified=parse_datetime(row['modified'] or row['created']),
+                group_id=groups.get(row['group']),
+                text=row['text'],
+                image=row['image'] or '',
+            ))
+        return posts
+
+    def images(self, rows):
+        return [row['image'] for row in rows if row['image']]
+
+    def versions(self, objects):
+        slugs = Group.objects.filter(
+            pk__in={post.group_id for post in objects}
+        ).values_list('slug', flat=True)
+        return [
+            *map(group_version, slugs),
+            *_author_versions({post.author_id for post in objects}),
+        ]
+
+
+class CommentTransfer(Transfer):
+    model = Comment
+    name = 'comments'
+    fields = {
+        'post_author': 'post__author__username',
+        'post_created': 'post__created',
+        'author': 'author__username',
+        'created': 'created',
+        'text': 'text',
+        'parent_author': 'parent__author__username',
+        'parent_created': 'parent__created',
+    }
+
+    def lookup(self, rows):
+        """Пользователи, посты и уже загруженные комментарии для rows."""
+        users = self.users(
+            name for row in rows
+            for name in (row['author'], row['post_author'],
+                         row.get('parent_author'))
+        )
+        posts = {
+            (author, created): pk for pk, author, created in
+            Post.objects.filter(
+                author__in=users.values(),
+                created__in=[
+                    parse_datetime(row['post_created']) for row in rows
+                ],
+            ).values_list('pk', 'author_id', 'created')
+        }
+        comments = {
+            (post, author, created): pk
+            for pk, post, author, created in Comment.objects.filter(
+                post__in=posts.values(),
+                created__in=[
+                    parse_datetime(row[field]) for row in rows
+                    for field in ('created', 'parent_created')
+                    if row.get(field)
+                ],
+            ).values_list('pk', 'post_id', 'author_id', 'created')
+        }
+        return users, posts, comments
+
+    def keys(self, row, users, posts):
+        """Ключи комментария строки и его родителя (или None)."""
+        post = posts.get((
+            users.get(row['post_author']),
+            parse_datetime(row['post_created'])
+        ))
+        key = (post, users.get(row['author']), parse_datetime(row['created']))
+        # В выгрузках старых версий колонок родителя нет.
+        parent = None
+        if row.get('parent_author'):
+            parent = (
+                post, users.get(row['parent_author']),
+                parse_datetime(row['parent_created'])
+            )
+        return key, parent
+
+    def build(self, rows):
+        users, posts, existing = self.lookup(rows)
+        known = set(existing)
+        comments = []
+        for row in rows:
+            key, parent = self.keys(row, users, posts)
+            post, author, created = key
+            # Ответ без загруженного родителя пропускается, как и строка
+            # без автора: иначе он стал бы корнем ветки.
+            if (post is None or author is None or key in known
+                    or parent is not None and parent not in known):
+                continue
+            known.add(key)
+            comments.append(Comment(
+                post_id=post, author_id=author, created=created,
+                text=row['text']
+            ))
+        return comments
+
+    def link(self, rows):
+        # Родитель выгружается раньше ответа, но может попасть в ту же
+        # пачку, поэтому parent ставится уже после bulk_create. path и
+        # depth по нему дописывает threads.fill_paths.
+        rows = [row for row in rows if row.get('parent_author')]
+        if not rows:
+            return
+        users, posts, comments = self.lookup(rows)
+        replies = []
+        for row in rows:
+            key, parent = self.keys(row, users, posts)
+            if key in comments and parent in comments:
+                replies.append(
+                    Comment(pk=comments[key], parent_id=comments[parent])
+                )
+        Comment.objects.bulk_update(replies, ['parent'], BATCH_SIZE)
+
+    def versions(self, objects):
+        return [post_version(comment.post_id) for comment in objects]
+
+
+class FollowTransfer(Transfer):
+    model = Follow
+    name = 'follows'
+    fields = {
+        'user': 'user__username',
+        'author': 'author__username',
+    }
+
+    def build(self, rows):
+        users = self.users(
+            name for row in rows for name in (row['user'], row['author'])
+        )
+        pairs = {
+            (users[row['user']], users[row['author']]) for row in rows
+            if row['user'] in users and row['author'] in users
+            and row['user'] != row['author']
+        }
+        existing = set(
+            Follow.objects.filter(user__in={user for user, _ in pairs})
+            .values_list('user_id', 'author_id')
+        )
+        return [
+            Follow(user_id=user, author_id=author)
+            for user, author in pairs - existing
+        ]
+
+    def versions(self, objects):
+        # Кроме страниц подписчика устаревает и его массив подписок.
+        users = {follow.user_id for follow in objects}
+        return [
+            *(follows_version(user) for user in users),
+            *(follows.VERSION.format(user) for user in users),
+            *_author_versions(
+                users | {follow.author_id for follow in objects}
+            ),
+        ]
+
+
+# Порядок важен: каждая модель ссылается только на предыдущие.
+TRANSFERS = (GroupTransfer, PostTransfer, CommentTransfer, FollowTransfer)
+
+
+def data_path(directory, transfer, file_format):
+    return os.path.join(directory, f'{transfer.name}.{file_format}')
+
+
+def write_rows(path, columns, rows):
+    """Дописывает строки в конец файла, для нового CSV — с заголовком."""
+    is_new = not os.path.exists(path)
+    with open(path, 'a', encoding='utf-8', newline='') as output:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(output, fieldnames=columns)
+            if is_new:
+                writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                output.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8', newline='') as source:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(source):
+                # В CSV нет null: пустая строка означает отсутствие значения.
+                yield {key: value or None for key, value in row.items()}
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def copy_image(name, source_root):
+    """Копирует картинку из source_root в хранилище, если её там нет."""
+    path = os.path.join(source_root, name)
+    if default_storage.exists(name) or not os.path.exists(path):
+        return False
+    with open(path, 'rb') as image:
+        default_storage.save(name, File(image))
+    return True
+
+
+def export_image(name, target_root):
+    target = os.path.join(target_root, name)
+    if os.path.exists(target) or not default_storage.exists(name):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with default_storage.open(name) as image, open(target, 'wb') as output:
+        shutil.copyfileobj(image, output)
+
+
+def checkpoint_path(path):
+    return f'{path}.checkpoint'
+
+
+def read_checkpoint(path):
+    """Позиция, до которой дошёл прерванный запуск, или 0."""
+    try:
+        with open(checkpoint_path(path)) as checkpoint:
+            return int(checkpoint.read() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, position):
+    with open(checkpoint_path(path), 'w') as checkpoint:
+        checkpoint.write(str(position))
+
+
+def clear_checkpoint(path):
+    if os.path.exists(checkpoint_path(path)):
+        os.remove(checkpoint_path(path))
@@ -0,0 +1,70 @@
+"""Популярные посты: сумма событий с затуханием по времени.
+
+Событие поста — публикация, комментарий, в будущем реакции — весит
+weight·e^(−(now − t)/τ), где τ = TRENDING_HALF_LIFE / ln 2. Множитель
+затухания у всех постов общий, поэтому Post.trending хранит логарифм
+суммы, отсчитанный не от now, а от эпохи EPOCH:
+ln Σ weightᵢ·e^((tᵢ − EPOCH)/τ). Порядок постов по нему совпадает с
+порядком по сумме на текущий момент, так что оценки не пересчитываются
+со временем, а страница популярного — проход по индексу (-trending,
+-id) с LIMIT. Новое событие меняет одну строку одним UPDATE:
+trending = max(trending, x) + ln(1 + e^(−|trending − x|)).
+
+Удалённые комментарии из оценки не вычитаются, их вклад и так
+затухает. recompute() собирает оценки заново, например после
+bulk_create или смены TRENDING_HALF_LIFE.
+"""
+import math
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+
+from .models import Comment, Post
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+BATCH_SIZE: int = 500
+
+
+def event_score(moment, weight=1):
+    """Вклад события в момент moment в логарифмической шкале."""
+    tau = settings.TRENDING_HALF_LIFE / math.log(2)
+    return math.log(weight) + (moment - EPOCH).total_seconds() / tau
+
+
+def combine(scores):
+    peak = max(scores)
+    return peak + math.log(sum(math.exp(score - peak) for score in scores))
+
+
+def record(post_id, moment, weight=1):
+    """Добавляет событие поста к его оценке."""
+    score = Value(event_score(moment, weight), output_field=FloatField())
+    Post.objects.filter(pk=post_id).update(
+        trending=Greatest(F('trending'), score)
+        + Ln(1 + Exp(-Abs(F('trending') - score)))
+    )
+
+
+def recompute():
+    """Пересчитывает оценки всех постов; возвращает число постов."""
+    ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        scores = {
+            pk: [event_score(created)]
+            for pk, created in Post.objects.filter(
+                pk__in=batch
+            ).values_list('pk', 'created')
+        }
+        for post_id, created in Comment.objects.filter(
+            post_id__in=batch
+        ).values_list('post_id', 'created'):
+            scores[post_id].append(event_score(created))
+        Post.objects.bulk_update(
+            [Post(pk=pk, trending=combine(post_scores))
+             for pk, post_scores in scores.items()],
+            ['trending'],
+        )
+    return len(ids)
@@ -1,97 +1,262 @@
+from itertools import islice
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
-from django.views.decorators.cache import cache_page
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.safestring import mark_safe
+
+from core import routers
+
+from . import feed, follows, recommendations, search, threads, thumbnails
+from .cache import (
+    author_version, follows_version, group_version, page_etag, post_version,
+    replica_reads, versioned_cache_page, with_etag
+)
+from .counters import stats_for
 from .forms import CommentForm, PostForm
-from .models import Follow, Post, Group, User
+from .models import Comment, Follow, Post, Group, User
+from .paginator import CursorPaginator, get_page
 
 COUNT: int = 10
+COMMENTS_COUNT: int = 50
+TRENDING_COUNT: int = 20
+STREAM_MARKER: str = '<!-- comments -->'
+
+
+def followed_authors(request, page_obj):
+    """Авторы постов страницы, на которых подписан пользователь.
 
+    Для гостя None: отметки подписки не выводятся.
+    """
+    if not request.user.is_authenticated:
+        return None
+    return follows.followed_among(
+        request.user, {post.author_id for post in page_obj}
+    )
 
-@cache_page(20, key_prefix='index_page')
+
+@versioned_cache_page('index', follows_version('{user}'))
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('group')
-    paginator = Paginator(post_list, COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = get_page(request, post_list, COUNT)
     context = {
         'page_obj': page_obj,
+        'followed_authors': followed_authors(request, page_obj),
     }
     return render(request, template, context)
 
 
+def trending_index(request):
+    """Самые популярные посты: проход по индексу post_trending_idx."""
+    posts = list(
+        Post.objects.select_related('author', 'group')
+        .order_by('-trending', '-pk')[:TRENDING_COUNT]
+    )
+    context = {
+        'posts': posts,
+        'trending': True,
+        'followed_authors': followed_authors(request, posts),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@versioned_cache_page(group_version('{slug}'), follows_version('{user}'))
 def group_posts(request, slug):
     groups = get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
     title = groups.title
     description = groups.description
-    posts = groups.posts.all()
-    paginator = Paginator(posts, COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page(
+        request, groups.posts.select_related('author'), COUNT
+    )
     context = {
         'title': title,
         'description': description,
         'groups': groups,
-        'posts': posts,
         'page_obj': page_obj,
+        'followed_authors': followed_authors(request, page_obj),
     }
     return render(request, template, context)
 
 
+@versioned_cache_page(
+    author_version('{username}'), follows_version('{user}'),
+    recommendations.VERSION,
+)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    post_count = post_list.count()
-    following = (request.user.is_authenticated
-                 and author.following.filter(user=request.user).exists())
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.select_related('group')
+    page_obj = get_page(request, post_list, COUNT)
+    stats = stats_for(author)
+    following = follows.is_following(request.user, author.pk)
     context = {
         'author': author,
         'username': username,
         'page_obj': page_obj,
-        'post_count': post_count,
-        'following': following
+        'post_count': stats.posts_count,
+        'stats': stats,
+        'following': following,
+        'recommended': recommendations.for_user(request.user),
     }
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = post.author.posts.count()
+    posts = Post.objects.select_related('author__stats', 'group')
+    # Только что созданный или удалённый пост реплика может ещё не видеть.
+    with replica_reads([post_version(post_id)]):
+        post = get_object_or_404(posts, pk=post_id)
+    names = (
+        post_version(post.pk), author_version(post.author.username),
+        group_version(post.group.slug if post.group else None),
+    )
+    # Ответ уходит с ETag этих версий: если какая-то из них недавно
+    # менялась, пост с реплики мог устареть и перечитывается.
+    with replica_reads(names):
+        if post._state.db != 'default' and not routers.replicas_allowed():
+            post = get_object_or_404(posts, pk=post_id)
+        # Пост уже загружен, а комментарии ещё нет: неизменившаяся
+        # страница отдаётся 304 без их выборки и рендеринга.
+        etag = page_etag(request, 'post_detail', *names)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = render_post_detail(request, post)
+    return with_etag(response, etag)
+
+
+def render_post_detail(request, post):
+    post_count = stats_for(post.author).posts_count
     form = CommentForm()
-    post_comments = post.comments.all()
+    post_comments = post.comments.filter(depth=0).select_related('author')
+    cursor = request.GET.get('comments')
     context = {
         'post': post,
         'post_count': post_count,
-        'comments': post_comments,
-        'form': form
+        'form': form,
+        'reply_to': request.GET.get('reply', '')
     }
+    if cursor is None and (
+        post.comments_count >= settings.POST_COMMENTS_STREAM_FROM
+    ):
+        return stream_post_detail(request, context, post_comments)
+    comments = CursorPaginator(post_comments, COMMENTS_COUNT).get_page(cursor)
+    comments.object_list = threads.attach_replies(comments.object_list)
+    context['comments'] = comments
     return render(request, 'posts/post_detail.html', context)
 
 
+def stream_post_detail(request, context, comments):
+    """Отдаёт страницу поста сразу, а комментарии — по мере выборки.
+
+    Страница рендерится целиком с меткой на месте комментариев; всё до
+    метки уходит клиенту первым куском, дальше идут пачки комментариев
+    из итератора по курсору базы, в конце — остаток страницы.
+    """
+    context['stream_marker'] = mark_safe(STREAM_MARKER)
+    head, tail = render_to_string(
+        'posts/post_detail.html', context, request
+    ).split(STREAM_MARKER)
+    comments = comments.order_by('-created', '-pk').iterator(
+        chunk_size=COMMENTS_COUNT
+    )
+
+    def chunks():
+        yield head
+        while True:
+            chunk = list(islice(comments, COMMENTS_COUNT))
+            if not chunk:
+                break
+            yield render_to_string(
+                'posts/includes/comments.html',
+                {'comments': threads.attach_replies(chunk)}, request
+            )
+        yield tail
+
+    return StreamingHttpResponse(chunks())
+
+
+def post_comments(request, post_id):
+    """Следующая пачка комментариев для кнопки «Показать ещё»."""
+    post = get_object_or_404(Post, pk=post_id)
+    page = CursorPaginator(
+        post.comments.filter(depth=0).select_related('author'),
+        COMMENTS_COUNT
+    ).get_page(request.GET.get('cursor'))
+    page.object_list = threads.attach_replies(page.object_list)
+    response = render(
+        request, 'posts/includes/comments.html', {'comments': page}
+    )
+    response['X-Next-Cursor'] = page.next_cursor
+    return response
+
+
+def comment_replies(request, post_id, comment_id):
+    """Следующая страница ответов в ветке комментария.
+
+    Ответы идут в порядке ветки; курсор — path последнего показанного.
+    """
+    comment = get_object_or_404(Comment, pk=comment_id, post_id=post_id)
+    after = request.GET.get('after', '')
+    if not (after.isdigit() and after.startswith(comment.path)):
+        after = None
+    replies, next_after = threads.replies_page(comment, after)
+    response = render(
+        request, 'posts/includes/comments.html', {'comments': replies}
+    )
+    response['X-Next-Cursor'] = next_after
+    return response
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    results = search.get_backend().search(query) if query else []
+    page_obj = Paginator(results, COUNT).get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
+    parent_id = request.POST.get('parent', '')
+    parent = None
+    if parent_id.isdigit():
+        parent = threads.reply_parent(
+            get_object_or_404(Comment, pk=parent_id, post=post)
+        )
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        comment.parent = parent
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
         return redirect('posts:profile', post.author)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -105,6 +270,8 @@ def post_edit(request, post_id):
     form = PostForm(request.POST, files=request.FILES or None, instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post.id)
     return render(request, 'posts/create_post.html',
                   {'form': form, 'is_edit': is_edit, 'post': post})
@@ -112,17 +279,21 @@ def post_edit(request, post_id):
 
 @login_required
 def follow_index(request):
-    follow_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(follow_list, COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    follow_list = feed.feed_for(request.user).select_related(
+        'author', 'group'
+    )
+    page_obj = get_page(
+        request, follow_list, COUNT, feed.FeedPaginator(request.user, COUNT)
+    )
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'recommended': recommendations.for_user(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     follower = request.user
     author = get_object_or_404(User, username=username)
@@ -132,6 +303,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     follower = request.user
     author = get_object_or_404(User, username=username)
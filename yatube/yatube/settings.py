@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,7 +66,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.MetricsDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -85,13 +87,70 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# База задаётся переменными окружения DB_*. DB_ENGINE — sqlite3,
+# postgresql или путь к бэкенду. DB_POOL_SIZE > 0 для PostgreSQL держит
+# соединения в пуле процесса (core.backends.postgresql_pool), иначе
+# соединение живёт DB_CONN_MAX_AGE секунд и переиспользуется запросами.
+# Перед запросом постоянное соединение проверяется (CONN_HEALTH_CHECKS).
+DATABASE_BACKENDS = {
+    'sqlite3': 'core.backends.sqlite3',
+    'postgresql': 'django.db.backends.postgresql',
+}
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite3')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 0))
+if DB_POOL_SIZE and DB_ENGINE == 'postgresql':
+    DB_ENGINE = 'core.backends.postgresql_pool'
+
+# PRAGMA для SQLite (core.backends.sqlite3) на каждом соединении: WAL
+# пускает читателей параллельно с писателем, а писатели ждут друг друга
+# до busy_timeout миллисекунд.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': DATABASE_BACKENDS.get(DB_ENGINE, DB_ENGINE),
+        'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL_SIZE else int(os.getenv('DB_CONN_MAX_AGE', 60))
+        ),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': DB_POOL_SIZE},
+        'PRAGMAS': SQLITE_PRAGMAS,
     }
 }
 
+# Реплики для чтения: DB_REPLICAS — хосты PostgreSQL или, для SQLite,
+# пути к копиям базы через запятую. Локально реплику на SQLite обновляет
+# команда sync_replicas. В тестах реплики смотрят в тестовую основную
+# базу (TEST MIRROR). GET-запросы читают с реплик, а клиент, который
+# только что записал, REPLICA_STICKY_SECONDS читает основную базу.
+# Столько же после изменения данных страницы, которые от них зависят,
+# собираются по основной базе (posts.cache.replica_reads).
+DB_REPLICAS = [name for name in os.getenv('DB_REPLICAS', '').split(',')
+               if name]
+DB_REPLICA_FIELD = (
+    'NAME' if 'sqlite' in DATABASES['default']['ENGINE'] else 'HOST'
+)
+DATABASE_REPLICAS = []
+for index, replica in enumerate(DB_REPLICAS, 1):
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'],
+        **{DB_REPLICA_FIELD: replica},
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(f'replica_{index}')
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -145,8 +204,120 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Общий для всех процессов кэш (L2) задаётся SHARED_CACHE_URL:
+# sqlite:///путь/к/cache.sqlite3, file:///путь/к/каталогу или
+# redis://хост:порт/база (нужен пакет django-redis). Без переменной L2 —
+# память процесса, как раньше. Перед ним в каждом процессе стоит L1
+# (core.cache.TieredCache), который сбрасывается по журналу изменений в L2.
+SHARED_CACHE_URL = os.getenv('SHARED_CACHE_URL', '')
+SHARED_CACHE_BACKENDS = {
+    'sqlite': 'core.cache.SQLiteCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+SHARED_CACHE_SCHEME = SHARED_CACHE_URL.partition('://')[0]
+if SHARED_CACHE_SCHEME in SHARED_CACHE_BACKENDS:
+    SHARED_CACHE = {
+        'BACKEND': SHARED_CACHE_BACKENDS[SHARED_CACHE_SCHEME],
+        'LOCATION': (
+            SHARED_CACHE_URL if SHARED_CACHE_SCHEME == 'redis'
+            else SHARED_CACHE_URL.partition('://')[2]
+        ),
+    }
+else:
+    SHARED_CACHE = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
     }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'CHECK_INTERVAL': 1,
+        },
+    },
+    'shared': SHARED_CACHE,
+}
+
+# Авторы, у которых подписчиков не меньше этого числа, не раскладываются
+# по лентам подписчиков при публикации, а подмешиваются при чтении ленты.
+FEED_FANOUT_LIMIT = 1000
+
+# Пагинация списков постов: 'cursor' (keyset по created и id)
+# или 'numbered' (классический Paginator с ?page=N).
+POSTS_PAGINATION = 'cursor'
+
+# Страницы в posts.cache привязаны к версиям контента и сбрасываются
+# при его изменении, поэтому их можно хранить долго.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько живёт в кэше массив подписок пользователя (posts.follows).
+# Подписка и отписка сбрасывают его сами, срок лишь освобождает память
+# от массивов тех, кто давно не заходил.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+
+# Страница поста с таким числом комментариев и больше отдаётся потоком:
+# пост сразу, комментарии пачками по мере выборки из базы.
+POST_COMMENTS_STREAM_FROM = 500
+
+# Через сколько секунд вклад события в популярность поста (posts.trending)
+# уменьшается вдвое. После смены запустите reconcile_counters: он
+# пересчитает оценки.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+
+# Миниатюры картинок постов строятся в фоне (posts.thumbnails), шаблоны
+# только читают готовые. Размеры должны совпадать с {% thumbnail %}.
+THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedThumbnailBackend'
+THUMBNAIL_KVSTORE = 'posts.thumbnails.CacheKVStore'
+THUMBNAIL_WORKERS = 2
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+# Тег {% picture %} (core.templatetags.responsive) и фоновый поток
+# миниатюр строят к каждой геометрии копии этих ширин, а также версии в
+# AVIF и WebP, если Pillow умеет их сохранять.
+RESPONSIVE_IMAGE_WIDTHS = (320, 640)
+RESPONSIVE_IMAGE_FORMATS = ('AVIF', 'WEBP')
+
+# Миниатюры лежат под THUMBNAIL_PREFIX, а их имена — хэш исходника и
+# опций, поэтому браузер может хранить их сколько угодно.
+MEDIA_CACHE_CONTROL = {
+    'cache/': 'public, max-age=31536000, immutable',
+    '': 'public, max-age=86400',
+}
+
+# Загруженные картинки постов (posts.images): больше POST_IMAGE_MAX_PIXELS
+# пикселей отклоняются, остальные ужимаются до POST_IMAGE_MAX_SIDE по
+# длинной стороне и перекодируются без метаданных. Картинки не крупнее
+# этого и не тяжелее POST_IMAGE_KEEP_BYTES без метаданных не трогаются.
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_MAX_SIDE = 2048
+POST_IMAGE_KEEP_BYTES = 512 * 1024
+POST_IMAGE_QUALITY = 85
+
+# Метрики запросов (core.middleware): Server-Timing и лог core.metrics.
+# Запросы дольше REQUEST_METRICS_SLOW_MS пишутся в лог с уровнем WARNING,
+# остальные — с INFO. Профили cProfile медленных запросов сохраняются
+# в REQUEST_PROFILE_DIR для доли REQUEST_PROFILE_SAMPLE_RATE запросов.
+REQUEST_METRICS_SLOW_MS = 500
+REQUEST_PROFILE_DIR = os.getenv('REQUEST_PROFILE_DIR')
+REQUEST_PROFILE_SAMPLE_RATE = 0.01
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.metrics': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }